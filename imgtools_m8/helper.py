@@ -3,7 +3,6 @@ A helper class for image processing operations.
 """
 import os
 import pathlib
-import math
 from numpy import ndarray
 from ve_utils.utils import UType as Ut
 from imgtools_m8.exceptions import ImgToolsException
@@ -15,6 +14,25 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
+# Lower case image extensions supported by OpenCV
+_VALID_IMAGE_EXTS = (
+    '.bmp', '.dib',
+    '.jpg', '.jpeg', '.jpe',
+    '.jp2', '.png', '.webp',
+    '.avif', '.pbm', '.pgm',
+    '.ppm', '.pxm', '.pnm',
+    '.pfm', '.sr', '.ras',
+    '.tiff', '.tif', '.exr',
+    '.hdr', '.pic'
+)
+_VALID_JPG_EXTS = ('.jpg', '.jpeg', '.jpe', '.jp2')
+_VALID_IMAGE_EXTS_SET = frozenset(_VALID_IMAGE_EXTS)
+_VALID_JPG_EXTS_SET = frozenset(_VALID_JPG_EXTS)
+# Size units, each one 1024 (1 << 10) times the previous
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
+# Directory of the models shipped with the package
+_MODELS_PATH = os.path.join(os.path.dirname(__file__), 'models')
+
 
 class ImageToolsHelper:
     """
@@ -65,14 +83,21 @@ class ImageToolsHelper:
         return dp[total]
 
     @staticmethod
-    def find_all_combinations(total: int, numbers: list) -> list:
+    def find_all_combinations(total: int,
+                              numbers: list,
+                              length: int or None = None
+                              ) -> list:
         """
         Find all combinations of numbers that add up to the given total.
 
         :param total: The target total.
         :type total: int
-        :param numbers: A list of numbers that can be added to achieve the total.
+        :param numbers: A list of positive numbers that can be added to achieve the total.
         :type numbers: list
+        :param length:
+            Only get the combinations of this many numbers,
+            partial combinations that can't reach it are dropped while searching.
+        :type length: int or None, optional
 
         :return: A list of lists containing all possible combinations.
         :rtype: list[list[int]]
@@ -84,6 +109,8 @@ class ImageToolsHelper:
         Example:
             >>> ImageToolsHelper.find_all_combinations(total=5, numbers=[1, 2, 3])
             >>> [[1, 1, 1, 1, 1], [1, 1, 1, 2], [1, 2, 2], [1, 1, 3], [2, 3]]
+            >>> ImageToolsHelper.find_all_combinations(total=5, numbers=[1, 2, 3], length=2)
+            >>> [[3, 2], [2, 3]]
         """
         if not Ut.is_int(total, mini=0):
             raise ImgToolsException(
@@ -94,16 +121,27 @@ class ImageToolsHelper:
             raise ImgToolsException(
                 "Error: Unable to find combinations, 'numbers' must be a non-empty list."
             )
+        if length is not None \
+                and not Ut.is_int(length, mini=0):
+            raise ImgToolsException(
+                "Error: Unable to find combinations, 'length' must be a non-negative integer."
+            )
+        mini, maxi = min(numbers), max(numbers)
         dp = [None] * (total + 1)
         dp[0] = [[]]
 
         for current_total in range(1, total + 1):
             all_combinations = []
+            rest = total - current_total
             for num in numbers:
                 if current_total - num >= 0 and dp[current_total - num] is not None:
                     for combination in dp[current_total - num]:
                         new_combination = combination + [num]
-                        all_combinations.append(new_combination)
+                        # keep it only if the rest can be reached in the remaining numbers
+                        if length is None \
+                                or mini * (length - len(new_combination)) \
+                                <= rest <= maxi * (length - len(new_combination)):
+                            all_combinations.append(new_combination)
 
             dp[current_total] = all_combinations
 
@@ -168,7 +206,7 @@ class ImageToolsHelper:
             >>> ImageToolsHelper.get_package_models_path()
         '/path/to/package/models'
         """
-        return os.path.join(os.path.dirname(__file__), 'models')
+        return _MODELS_PATH
 
     @staticmethod
     def get_images_list(path: str) -> list:
@@ -212,18 +250,25 @@ class ImageToolsHelper:
         result = None
         if Ut.is_str(path, not_null=True) \
                 and os.path.isdir(path):
-            result = [
-                f
-                for f in os.listdir(path)
-                if os.path.isfile(os.path.join(path, f))
-                and (ext is None
-                     or (Ut.is_list(ext, not_null=True) and ImageToolsHelper.get_extension(f) in ext)
-                     or (Ut.is_str(ext, not_null=True) and ImageToolsHelper.get_extension(f) == ext)
-                     )
-                and (content_name is None
-                     or (Ut.is_str(content_name, not_null=True) and content_name in f)
-                     )
-            ]
+            # resolve the filters once, an invalid filter matches no file
+            if ext is None:
+                exts = None
+            elif Ut.is_list(ext, not_null=True):
+                exts = frozenset(e.lower() for e in ext if isinstance(e, str))
+            elif Ut.is_str(ext, not_null=True):
+                exts = frozenset((ext.lower(),))
+            else:
+                exts = frozenset()
+            result = []
+            if content_name is None \
+                    or Ut.is_str(content_name, not_null=True):
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        if (content_name is None or content_name in name) \
+                                and entry.is_file() \
+                                and (exts is None or ImageToolsHelper.get_extension(name) in exts):
+                            result.append(name)
         return result
 
     @staticmethod
@@ -238,16 +283,7 @@ class ImageToolsHelper:
             >>> ImageToolsHelper.get_valid_images_ext()
             ['.bmp', '.dib', '.jpg', '.jpeg', '.jpe', '.jp2', '.png', ...]
         """
-        return [
-            '.bmp', '.dib',
-            '.jpg', '.jpeg', '.jpe',
-            '.jp2', '.png', '.webp',
-            '.avif', '.pbm', '.pgm',
-            '.ppm', '.pxm', '.pnm',
-            '.pfm', '.sr', '.ras',
-            '.tiff', '.tif', '.exr',
-            '.hdr', '.pic'
-        ]
+        return list(_VALID_IMAGE_EXTS)
 
     @staticmethod
     def get_valid_jpg_ext() -> list:
@@ -261,9 +297,7 @@ class ImageToolsHelper:
             >>> ImageToolsHelper.get_valid_jpg_ext()
             ['.jpg', '.jpeg', '.jpe', '.jp2']
         """
-        return [
-            '.jpg', '.jpeg', '.jpe', '.jp2'
-        ]
+        return list(_VALID_JPG_EXTS)
 
     @staticmethod
     def is_valid_image_ext(ext: str) -> bool:
@@ -280,11 +314,8 @@ class ImageToolsHelper:
             >>> ImageToolsHelper.is_valid_image_ext('.png')
                 True
         """
-        result = False
-        if Ut.is_str(ext, not_null=True):
-            ext = ext.lower()
-            result = ext in ImageToolsHelper.get_valid_images_ext()
-        return result
+        return isinstance(ext, str) \
+            and ext.lower() in _VALID_IMAGE_EXTS_SET
 
     @staticmethod
     def is_valid_jpg_ext(ext: str):
@@ -301,8 +332,8 @@ class ImageToolsHelper:
             >>> ImageToolsHelper.is_valid_jpg_ext('.jpg')
             True
         """
-        ext = ext.lower()
-        return ext in ImageToolsHelper.get_valid_jpg_ext()
+        return isinstance(ext, str) \
+            and ext.lower() in _VALID_JPG_EXTS_SET
 
     @staticmethod
     def cut_file_name(file_name: str, ext_len: int = 1) -> tuple:
@@ -325,7 +356,8 @@ class ImageToolsHelper:
         ext = ImageToolsHelper.get_extension(file_name, ext_len)
         if Ut.is_str(file_name, not_null=True) \
                 and Ut.is_str(ext):
-            name = file_name.replace(ext, '')
+            # the extension is lower case, cut it by length from the end
+            name = file_name[:len(file_name) - len(ext)]
         return name, ext
 
     @staticmethod
@@ -348,16 +380,14 @@ class ImageToolsHelper:
         ext = None
         if Ut.is_str(path, not_null=True):
             ext_len = Ut.get_int(ext_len, default=1)
+            # pure path, the file system is never accessed
+            file_path = pathlib.PurePath(path)
             if ext_len == 1:
-                ext = pathlib.Path(path).suffix
-            elif ext_len == 2:
-                ext_list = pathlib.Path(path).suffixes[-2:]
-                ext = "".join(ext_list)
-            elif ext_len == 3:
-                ext_list = pathlib.Path(path).suffixes[-3:]
-                ext = "".join(ext_list)
+                ext = file_path.suffix
+            elif ext_len in (2, 3):
+                ext = "".join(file_path.suffixes[-ext_len:])
             else:
-                ext = "".join(pathlib.Path(path).suffixes)
+                ext = "".join(file_path.suffixes)
             ext = ext.lower()
         return ext
 
@@ -378,11 +408,10 @@ class ImageToolsHelper:
         """
         if size_bytes == 0:
             return "0 B"
-        size_name = ("B", "KB", "MB", "GB", "TB", "PB", "EB", "ZB", "YB")
-        i = int(math.floor(math.log(size_bytes, 1024)))
-        p = math.pow(1024, i)
-        s = round(size_bytes / p, 2)
-        return "%s %s" % (s, size_name[i])
+        # unit index from the integer bit length, no float logarithm needed
+        i = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+        s = round(size_bytes / (1 << (10 * i)), 2)
+        return "%s %s" % (s, _SIZE_UNITS[i])
 
     @staticmethod
     def get_string_file_size(source_path: str) -> str:
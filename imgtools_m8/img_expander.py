@@ -3,8 +3,8 @@ Image Expander class
 
 This module provides a tool for expanding images using Super-Resolution techniques.
 """
-from cv2 import dnn_superres
-from numpy import ndarray
+from cv2 import dnn_superres, dnn, cuda
+from numpy import ndarray, empty, ascontiguousarray
 import os
 from ve_utils.utils import UType as Ut
 from imgtools_m8.model_conf import ModelConf, ScaleSelector
@@ -18,6 +18,12 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
+# Opt-in with IMGTOOLS_M8_CUDA=1, models then run on the first CUDA device if any
+_CUDA_ENV = "IMGTOOLS_M8_CUDA"
+# Overlapping tiles used when tiling is enabled with set_tiling, to bound the model memory
+_TILE_SIZE = 256
+_TILE_PAD = 32
+
 
 class ImageExpander:
     """
@@ -27,16 +33,69 @@ class ImageExpander:
     """
     def __init__(self,
                  model_conf: dict or None = None,
+                 tile_size: int = _TILE_SIZE,
+                 tile_pad: int = _TILE_PAD,
+                 tile_min_pixels: int or None = None
                  ):
         """
         Initialize the ImageExpander instance.
 
         :param model_conf: Configuration for the Super-Resolution model.
         :type model_conf: dict, optional
+        :param tile_size: The tile size in pixels, for images upscaled by tiles.
+        :type tile_size: int, optional
+        :param tile_pad: The margin added around each tile, in pixels.
+        :type tile_pad: int, optional
+        :param tile_min_pixels: Images with more pixels are upscaled by tiles, None to never tile (default).
+        :type tile_min_pixels: int or None, optional
         """
         self.model_conf = None
         self.sr = None
+        self.tile_size = _TILE_SIZE
+        self.tile_pad = _TILE_PAD
+        self.tile_min_pixels = None
+        # loaded models by (model file path, model name, scale)
+        self._sr_models = {}
         self.set_model_conf(model_conf)
+        self.set_tiling(tile_size, tile_pad, tile_min_pixels)
+
+    def set_tiling(self,
+                   tile_size: int,
+                   tile_pad: int,
+                   tile_min_pixels: int or None
+                   ) -> bool:
+        """
+        Set how large images are split in tiles to be upscaled.
+
+        Tiling is disabled by default. Tiled output may differ slightly
+        from a whole image upscale near tile borders, a larger margin
+        brings it closer for more compute.
+
+        :param tile_size: The tile size in pixels.
+        :type tile_size: int
+        :param tile_pad: The margin added around each tile, in pixels.
+        :type tile_pad: int
+        :param tile_min_pixels: Images with more pixels are upscaled by tiles, None to never tile.
+        :type tile_min_pixels: int or None
+
+        :return: True if the tiling settings are valid and set, False otherwise.
+        :rtype: bool
+
+        Example:
+            >>> expander = ImageExpander()
+            >>> expander.set_tiling(tile_size=512, tile_pad=32, tile_min_pixels=1024 * 1024)
+            True
+        """
+        result = False
+        if Ut.is_int(tile_size, mini=1) \
+                and Ut.is_int(tile_pad, mini=0) \
+                and (tile_min_pixels is None
+                     or Ut.is_int(tile_min_pixels, mini=0)):
+            self.tile_size = tile_size
+            self.tile_pad = tile_pad
+            self.tile_min_pixels = tile_min_pixels
+            result = True
+        return result
 
     def is_ready(self) -> bool:
         """
@@ -119,6 +178,25 @@ class ImageExpander:
         test = self.model_conf.is_ready()
         return test
 
+    @staticmethod
+    def is_cuda_enabled() -> bool:
+        """
+        Check if the super-resolution models must run on a CUDA device.
+
+        CUDA is used only if enabled with the IMGTOOLS_M8_CUDA=1 environment variable,
+        and if OpenCV is built with CUDA support and a CUDA device is available.
+
+        :return: True if the models must run on a CUDA device, False otherwise.
+        :rtype: bool
+
+        Example:
+            >>> os.environ['IMGTOOLS_M8_CUDA'] = '1'
+            >>> ImageExpander.is_cuda_enabled()
+            True
+        """
+        return os.environ.get(_CUDA_ENV) == "1" \
+            and cuda.getCudaEnabledDeviceCount() > 0
+
     def init_sr(self):
         """
         Initialize the Super-Resolution model.
@@ -130,10 +208,16 @@ class ImageExpander:
         """
         self.sr = dnn_superres.DnnSuperResImpl_create()
 
-    def load_model(self):
+    def load_model(self, scale: int or None = None):
         """
         Load the super-resolution model using the configured model configuration.
 
+        Each model file is read once per instance, loading a model already read
+        only selects it again.
+
+        :param scale: The model scale to load, the configured scale if None.
+        :type scale: int or None, optional
+
         :return: True if the model is loaded successfully, False otherwise.
         :rtype: bool
 
@@ -145,17 +229,39 @@ class ImageExpander:
         """
         test = False
         if self.has_model_conf():
+            if scale is None:
+                scale = self.model_conf.get_scale()
+            file_name = ModelConf.get_model_file_name(
+                path=self.model_conf.get_path(),
+                model_name=self.model_conf.get_model_name(),
+                scale=scale
+            )
             mod_path = os.path.join(
                 self.model_conf.get_path(),
-                self.model_conf.get_file_name()
+                file_name
+            ) if file_name is not None else None
+            key = (
+                mod_path,
+                self.model_conf.get_model_name(),
+                scale
             )
-            if os.path.isfile(mod_path):
-                self.sr.readModel(mod_path)
+            sr = self._sr_models.get(key)
+            if sr is None \
+                    and mod_path is not None \
+                    and os.path.isfile(mod_path):
+                sr = dnn_superres.DnnSuperResImpl_create()
+                sr.readModel(mod_path)
                 # Set the desired model and scale to get correct pre- and post-processing
-                self.sr.setModel(
+                sr.setModel(
                     self.model_conf.get_model_name(),
-                    self.model_conf.get_scale()
+                    scale
                 )
+                if ImageExpander.is_cuda_enabled():
+                    sr.setPreferableBackend(dnn.DNN_BACKEND_CUDA)
+                    sr.setPreferableTarget(dnn.DNN_TARGET_CUDA_FP16)
+                self._sr_models[key] = sr
+            if sr is not None:
+                self.sr = sr
                 test = True
         return test
 
@@ -163,6 +269,9 @@ class ImageExpander:
         """
         Upscale the input image using the loaded super-resolution model.
 
+        If tiling is enabled, images larger than tile_min_pixels are upscaled by tiles,
+        see tiled_upscale.
+
         :param image: The input image as a NumPy array.
 
         :return: The upscaled image.
@@ -176,9 +285,69 @@ class ImageExpander:
             >>> upscaled_image = expander.upscale_image(input_image)
         """
         if image is not None:
-            image = self.sr.upsample(image)
+            h, w = image.shape[:2]
+            if self.tile_min_pixels is not None \
+                    and h * w > self.tile_min_pixels:
+                image = self.tiled_upscale(image)
+            else:
+                # a sliced image is packed once here, the model reads contiguous HWC data
+                if not image.flags['C_CONTIGUOUS']:
+                    image = ascontiguousarray(image)
+                image = self.sr.upsample(image)
         return image
 
+    def tiled_upscale(self,
+                      image: ndarray,
+                      tile: int or None = None,
+                      pad: int or None = None
+                      ) -> ndarray:
+        """
+        Upscale the input image tile by tile using the loaded super-resolution model.
+
+        Each tile is upscaled with a margin of pad pixels from its neighbors,
+        then only its own area is kept. The model memory is bounded by the tile
+        size instead of the image size, but the output may differ slightly
+        from a whole image upscale near tile borders, where the model sees less context.
+
+        :param image: The input image as a NumPy array.
+        :type image: ndarray
+        :param tile: The tile size in pixels, tile_size by default.
+        :type tile: int or None, optional
+        :param pad: The margin added around each tile in pixels, tile_pad by default.
+        :type pad: int or None, optional
+
+        :return: The upscaled image.
+        :rtype: ndarray
+
+        Example:
+            >>> model_config = {'model_path': 'path/to/models', 'model_name': 'edsr', 'scale': 2}
+            >>> expander = ImageExpander(model_config)
+            >>> expander.load_model()
+            >>> input_image = ...  # Load or create your input image as a NumPy array
+            >>> upscaled_image = expander.tiled_upscale(input_image, tile=256, pad=32)
+        """
+        tile = self.tile_size if tile is None else tile
+        pad = self.tile_pad if pad is None else pad
+        h, w = image.shape[:2]
+        result, scale = None, 0
+        for y in range(0, h, tile):
+            for x in range(0, w, tile):
+                y0, x0 = max(y - pad, 0), max(x - pad, 0)
+                y1, x1 = min(y + tile + pad, h), min(x + tile + pad, w)
+                patch = self.sr.upsample(ascontiguousarray(image[y0:y1, x0:x1]))
+                if result is None:
+                    # the model output gives the scale of the loaded model
+                    scale = patch.shape[0] // (y1 - y0)
+                    result = empty(
+                        (h * scale, w * scale) + patch.shape[2:],
+                        dtype=patch.dtype
+                    )
+                th, tw = min(tile, h - y) * scale, min(tile, w - x) * scale
+                oy, ox = (y - y0) * scale, (x - x0) * scale
+                result[y * scale:y * scale + th, x * scale:x * scale + tw] = \
+                    patch[oy:oy + th, ox:ox + tw]
+        return result
+
     def many_image_upscale(self,
                            image: ndarray,
                            nb_upscale: int,
@@ -187,9 +356,12 @@ class ImageExpander:
         """
         Upscale an image multiple times using the super-resolution model.
 
+        The model of the given scale is selected without changing the configured scale,
+        so the configuration stays the same for the threads sharing this instance.
+
         :param image: The input image as a NumPy array.
         :param nb_upscale: The number of times to upscale the image.
-        :param scale: The model scale to use.
+        :param scale: The model scale to use, the configured scale if None.
 
         :return: The final upscaled image after multiple upscaling operations.
         :rtype: ndarray or None
@@ -215,12 +387,8 @@ class ImageExpander:
                     "Fatal Error: Invalid model scale selected."
                 )
 
-            if is_scale \
-                    and self.model_conf.scale != scale:
-                self.model_conf.set_scale(scale)
-                if not self.is_ready():
-                    self.init_sr()
-                self.load_model()
+            # selecting a model already read is only a lookup
+            self.load_model(scale=scale if is_scale else None)
 
             counter = 0
             while counter < nb_upscale and counter <= max_upscale:
@@ -2,10 +2,13 @@
 ImgTools_m8 core class.
 """
 import time
+import functools
 import cv2
 from numpy import ndarray
 import os
 import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 from ve_utils.utils import UType as Ut
 from imgtools_m8.helper import ImageToolsHelper
 from imgtools_m8.model_scale_selector import ModelScaleSelector
@@ -21,9 +24,14 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "2.0.0"
 
-logging.basicConfig()
 logger = logging.getLogger("imgTools_m8")
 
+# Threads writing the formats of a single image run, cv2.imwrite releases the GIL
+_WRITE_WORKERS = 4
+# JPEG options applied when a format doesn't set them,
+# lossless and giving smaller files for a small encoding cost
+_JPEG_DEFAULT_OPTIONS = {'progressive': 1, 'optimize': 1}
+
 
 class ImageTools:
     """
@@ -56,6 +64,10 @@ class ImageTools:
                 """
         self.expander = None
         self.conf = None
+        # the super resolution network is stateful, upscales run one at a time
+        self._expander_lock = threading.Lock()
+        # writes the formats of an image concurrently, only set while run() processes a single image
+        self._write_executor = None
         self.set_expander(model_conf)
         self.set_conf(
             source_path=source_path,
@@ -380,7 +392,8 @@ class ImageTools:
 
     def resize_image_if_needed(self,
                                image: ndarray,
-                               output_format: dict
+                               output_format: dict,
+                               resized_cache: dict or None = None
                                ) -> ndarray:
         """
         Resize the image if necessary based on the output format configuration.
@@ -389,6 +402,10 @@ class ImageTools:
         :type image: ndarray
         :param output_format: The output format configuration dictionary.
         :type output_format: dict
+        :param resized_cache:
+            Images already resized from this same input image,
+            by (fixed_width, fixed_height) target size.
+        :type resized_cache: dict or None, optional
 
         :return: The resized image as a NumPy ndarray if resizing is needed.
         :rtype: ndarray
@@ -405,17 +422,25 @@ class ImageTools:
         """
         if image is not None \
                 and Ut.is_dict(output_format, not_null=True):
+            fixed_width = output_format.get('fixed_width')
+            fixed_height = output_format.get('fixed_height')
+            if resized_cache is not None:
+                result = resized_cache.get((fixed_width, fixed_height))
+                if result is not None:
+                    return result
             size = ImageToolsHelper.get_image_size(image)
             params = ImageTools.get_downscale_size(
                 size=size,
-                fixed_height=output_format.get('fixed_height'),
-                fixed_width=output_format.get('fixed_width')
+                fixed_height=fixed_height,
+                fixed_width=fixed_width
             )
             if params is not None:
                 result = self.image_resize(
                     image=image,
                     **params
                 )
+                if resized_cache is not None:
+                    resized_cache[(fixed_width, fixed_height)] = result
             else:
                 return image
         else:
@@ -450,7 +475,7 @@ class ImageTools:
         if Ut.is_dict(upscale_stats, not_null=True) \
                 and Ut.is_list(upscale_stats.get('stats'), not_null=True):
             output_formats = self.conf.get_output_formats()
-            nb_output_formats = len(self.conf.get_output_formats())
+            nb_output_formats = len(output_formats)
             for upscale in upscale_stats.get('stats'):
                 key = upscale.get('key')
                 output_format = None
@@ -460,6 +485,41 @@ class ImageTools:
                 nb_upscale = upscale.get('nb_upscale')
                 yield key, output_format, scale, nb_upscale
 
+    def expand_image(self,
+                     image: ndarray,
+                     nb_upscale: int,
+                     scale: int or None = None
+                     ) -> ndarray or None:
+        """
+        Upscale the image with the super resolution model.
+
+        The model is stateful, so threads sharing this instance run their upscales
+        one at a time, the resizes and writes around them run concurrently.
+        The model is only loaded once an upscale is needed.
+
+        :param image: The image data as a NumPy ndarray.
+        :type image: ndarray
+        :param nb_upscale: The number of times to upscale the image.
+        :type nb_upscale: int
+        :param scale: The model scale to use, the configured scale if None.
+        :type scale: int or None, optional
+
+        :return: The upscaled image.
+        :rtype: ndarray or None
+
+        Example:
+            >>> tools = ImageTools(...)
+            >>> image = ImageTools.read_image("input_image.jpg")
+            >>> upscaled = tools.expand_image(image, nb_upscale=1, scale=3)
+        """
+        with self._expander_lock:
+            self.init_expander_model()
+            return self.expander.many_image_upscale(
+                image=image,
+                nb_upscale=nb_upscale,
+                scale=scale
+            )
+
     def upscale_with_auto_scale(self,
                                 image: ndarray,
                                 upscale_stats: dict,
@@ -495,8 +555,9 @@ class ImageTools:
         if image is not None \
                 and Ut.is_dict(upscale_stats, not_null=True) \
                 and Ut.is_list(upscale_stats.get('stats'), not_null=True):
-            self.init_expander_model()
             result = True
+            # output formats with the same size share one resize of the current image
+            resized_cache = {}
             for key, output_format, scale, nb_upscale in self.loop_on_upscale_stats(
                     upscale_stats=upscale_stats):
                 if nb_upscale > 0:
@@ -505,11 +566,12 @@ class ImageTools:
                         scale
                     )
                     start_upscale = time.perf_counter()
-                    image = self.expander.many_image_upscale(
+                    image = self.expand_image(
                         image=image,
                         nb_upscale=1,
                         scale=scale
                     )
+                    resized_cache.clear()
                     logger.debug(
                         "[ImageTools] Upscale image with %sx model scale in %s s",
                         scale,
@@ -517,12 +579,14 @@ class ImageTools:
                     )
                     resized = self.resize_image_if_needed(
                         image=image,
-                        output_format=output_format
+                        output_format=output_format,
+                        resized_cache=resized_cache
                     )
                 else:
                     resized = self.resize_image_if_needed(
                         image=image,
-                        output_format=output_format
+                        output_format=output_format,
+                        resized_cache=resized_cache
                     )
 
                 if key >= 0:
@@ -530,7 +594,8 @@ class ImageTools:
                         image=resized,
                         output_path=self.conf.get_output_path(),
                         file_name=file_name,
-                        output_formats=output_format.get('formats'))
+                        output_formats=output_format.get('formats'),
+                        executor=self._write_executor)
                     if write_test is False:
                         result = False
         return result
@@ -545,9 +610,10 @@ class ImageTools:
         if image is not None \
                 and Ut.is_dict(upscale_stats, not_null=True) \
                 and Ut.is_list(upscale_stats.get('stats'), not_null=True):
-            self.init_expander_model()
             result = True
             upscale_counter = 0
+            # output formats with the same size share one resize of the current image
+            resized_cache = {}
             for key, output_format, scale, nb_upscale in self.loop_on_upscale_stats(
                     upscale_stats=upscale_stats):
                 if nb_upscale > 0:
@@ -560,10 +626,11 @@ class ImageTools:
                         )
                         nb_upscale_needed = nb_upscale - upscale_counter
                         start_upscale = time.perf_counter()
-                        image = self.expander.many_image_upscale(
+                        image = self.expand_image(
                             image=image,
                             nb_upscale=nb_upscale_needed
                         )
+                        resized_cache.clear()
                         logger.debug(
                             "[ImageTools] Upscale image with %sx model scale in %s s",
                             self.get_model_scale(),
@@ -572,12 +639,14 @@ class ImageTools:
                         upscale_counter = nb_upscale
                     resized = self.resize_image_if_needed(
                         image=image,
-                        output_format=output_format
+                        output_format=output_format,
+                        resized_cache=resized_cache
                     )
                 else:
                     resized = self.resize_image_if_needed(
                         image=image,
-                        output_format=output_format
+                        output_format=output_format,
+                        resized_cache=resized_cache
                     )
 
                 if key >= 0:
@@ -585,7 +654,8 @@ class ImageTools:
                         image=resized,
                         output_path=self.conf.get_output_path(),
                         file_name=file_name,
-                        output_formats=output_format.get('formats'))
+                        output_formats=output_format.get('formats'),
+                        executor=self._write_executor)
                     if write_test is False:
                         result = False
         return result
@@ -633,7 +703,8 @@ class ImageTools:
                         image=resized,
                         output_path=self.conf.get_output_path(),
                         file_name=file_name,
-                        output_formats=output_format.get('formats')):
+                        output_formats=output_format.get('formats'),
+                        executor=self._write_executor):
                     result = False
         return result
 
@@ -675,33 +746,15 @@ class ImageTools:
                 and Ut.is_tuple(size) \
                 and Ut.is_dict(upscale_stats, not_null=True)\
                 and Ut.is_list(upscale_stats.get('stats'), not_null=True):
+            max_upscale = upscale_stats.get('max_upscale')
             # if upscale needed
-            if upscale_stats.get('max_upscale') > 0:
-                if self.is_auto_scale():
-                    logger.debug(
-                        "[ImageTools] Image need upscale x%s with auto scale",
-                        upscale_stats.get('max_upscale')
-                    )
-                    upscale_stats = ModelScaleSelector.define_model_scale(
-                        upscale_stats=upscale_stats,
-                        available_scales=self.get_available_model_scales()
-                    )
-                    result = self.upscale_with_auto_scale(
-                        image=image,
-                        upscale_stats=upscale_stats,
-                        file_name=file_name
-                    )
-                else:
-                    logger.debug(
-                        "[ImageTools] Image need upscale x%s with fixed scale (%sx)",
-                        upscale_stats.get('max_upscale'),
-                        self.get_model_scale()
-                    )
-                    result = self.upscale_with_fixed_scale(
-                        image=image,
-                        upscale_stats=upscale_stats,
-                        file_name=file_name
-                    )
+            if max_upscale > 0:
+                result = self.upscale_image(
+                    image=image,
+                    upscale_stats=upscale_stats,
+                    file_name=file_name,
+                    max_upscale=max_upscale
+                )
             # if only downscale or convert image needed
             else:
                 logger.debug(
@@ -714,6 +767,60 @@ class ImageTools:
                 )
         return result
 
+    def upscale_image(self,
+                      image: ndarray,
+                      upscale_stats: dict,
+                      file_name: str,
+                      max_upscale: int
+                      ) -> bool:
+        """
+        Upscale the image with the auto or fixed scale strategy and write images.
+
+        :param image: The input image as a NumPy ndarray.
+        :type image: ndarray
+        :param upscale_stats: Information about upscaling requirements.
+        :type upscale_stats: dict
+        :param file_name: The base file name for the output images.
+        :type file_name: str
+        :param max_upscale: The maximum number of upscales needed.
+        :type max_upscale: int
+
+        :return: True if the image is upscaled and written successfully, False otherwise.
+        :rtype: bool
+
+        Example:
+            >>> tools = ImageTools(...)
+            >>> input_image = ...  # Load your input image as a NumPy array
+            >>> upscale_info = {'max_upscale': 2, 'stats': [{'key': 0, 'nb_upscale': 2}]}
+            >>> success = tools.upscale_image(input_image, upscale_info, "output", 2)
+        """
+        if self.is_auto_scale():
+            logger.debug(
+                "[ImageTools] Image need upscale x%s with auto scale",
+                max_upscale
+            )
+            upscale_stats = ModelScaleSelector.define_model_scale(
+                upscale_stats=upscale_stats,
+                available_scales=self.get_available_model_scales()
+            )
+            result = self.upscale_with_auto_scale(
+                image=image,
+                upscale_stats=upscale_stats,
+                file_name=file_name
+            )
+        else:
+            logger.debug(
+                "[ImageTools] Image need upscale x%s with fixed scale (%sx)",
+                max_upscale,
+                self.get_model_scale()
+            )
+            result = self.upscale_with_fixed_scale(
+                image=image,
+                upscale_stats=upscale_stats,
+                file_name=file_name
+            )
+        return result
+
     def process_image(self,
                       source_path: str,
                       file_name: str
@@ -797,21 +904,42 @@ class ImageTools:
         if self.is_ready():
             if os.path.isfile(self.conf.get_source_path()):
                 file = os.path.basename(self.conf.get_source_path())
-                if self.process_image(
-                        source_path=self.conf.get_source_path(),
-                        file_name=file
-                        ):
-                    result = True
+                # a single image writes its formats concurrently,
+                # the threads are stopped before returning
+                with ThreadPoolExecutor(max_workers=_WRITE_WORKERS) as executor:
+                    self._write_executor = executor
+                    try:
+                        if self.process_image(
+                                source_path=self.conf.get_source_path(),
+                                file_name=file
+                                ):
+                            result = True
+                    finally:
+                        self._write_executor = None
             elif os.path.isdir(self.conf.get_source_path()):
                 files = ImageToolsHelper.get_images_list(self.conf.get_source_path())
                 if Ut.is_list(files, not_null=True):
                     result = True
-                    for file in files:
-                        if not self.process_image(
-                                    source_path=os.path.join(self.conf.get_source_path(), file),
-                                    file_name=file
-                                ):
-                            result = False
+                    # the source directory never changes, join it once
+                    prefix = self.conf.get_source_path().rstrip(os.sep) + os.sep
+                    # OpenCV releases the GIL while decoding, resizing and encoding,
+                    # so images are processed concurrently in threads,
+                    # each writing its formats in sequence.
+                    max_workers = min(len(files), os.cpu_count() or 1)
+                    # create the expander before the threads share it
+                    self.init_expander()
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        futures = [
+                            executor.submit(
+                                self.process_image,
+                                source_path=prefix + file,
+                                file_name=file
+                            )
+                            for file in files
+                        ]
+                        for future in as_completed(futures):
+                            if not future.result():
+                                result = False
         return result
 
     @staticmethod
@@ -852,19 +980,11 @@ class ImageTools:
                     and Ut.is_int(fixed_height, not_null=True) \
                     and (fixed_width < w
                          or fixed_height < h):
-                percent_w = ((w-fixed_width) * 100) / w
-                percent_h = ((h-fixed_height) * 100) / h
-                is_resize_all = fixed_height < h \
-                    and fixed_width < w
-                if (fixed_width < w
-                        and fixed_height >= h) \
-                        or (is_resize_all
-                            and percent_w >= percent_h):
+                # resize on the side with the smallest ratio,
+                # fixed_width / w <= fixed_height / h without float division
+                if fixed_width * h <= fixed_height * w:
                     result = {'width': fixed_width}
-                elif (fixed_height < h
-                        and fixed_width >= w) \
-                        or (is_resize_all
-                            and percent_w <= percent_h):
+                else:
                     result = {'height': fixed_height}
             elif Ut.is_int(fixed_height, not_null=True) \
                     and fixed_height < h:
@@ -942,6 +1062,9 @@ class ImageTools:
         """
         Get the options for writing images in JPEG format.
 
+        Progressive encoding and Huffman table optimization are enabled by default,
+        set them to 0 in the output format to disable them.
+
         :param output_format: The output format configuration dictionary.
         :type output_format: dict
 
@@ -959,6 +1082,8 @@ class ImageTools:
             >>> [cv2.IMWRITE_JPEG_QUALITY, 90, cv2.IMWRITE_JPEG_PROGRESSIVE, 1, cv2.IMWRITE_JPEG_OPTIMIZE, 1]
         """
         result = []
+        if Ut.is_dict(output_format, not_null=True):
+            output_format = {**_JPEG_DEFAULT_OPTIONS, **output_format}
         if Ut.is_int(output_format.get('quality')):
             result.append(cv2.IMWRITE_JPEG_QUALITY)
             result.append(output_format.get('quality'))
@@ -1062,8 +1187,81 @@ class ImageTools:
             >>> True
         """
         result = False
+        write_options = ImageTools.get_write_options(output_format)
+        if write_options is not None:
+            ext, options = write_options
+            result = ImageTools.write_image(
+                image=image,
+                output_path=output_path,
+                file_name=file_name,
+                ext=ext,
+                options=options
+            )
+        return result
+
+    @staticmethod
+    def get_write_options(output_format: dict) -> tuple or None:
+        """
+        Get the extension and the cv2 write options of a valid output format.
+
+        Results are cached by output format options,
+        so formats written for every image are only parsed once.
+
+        :param output_format: The output format configuration dictionary.
+        :type output_format: dict
+
+        :return: A tuple (extension, write options), or None if the output format is not valid.
+        :rtype: tuple or None
+
+        Example:
+            >>> ImageTools.get_write_options({'ext': '.png', 'compression': 3})
+            >>> ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 3])
+        """
+        key = ProcessConf.get_write_formats_key([output_format])
+        if key is not None:
+            return ImageTools.get_write_options_by_key(key[0])
+        return ImageTools.parse_write_options(output_format)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def get_write_options_by_key(format_key: tuple) -> tuple or None:
+        """
+        Get the extension and the cv2 write options of a write format key, caching the result.
+
+        The options list returned is shared between calls, it must not be modified.
+
+        :param format_key: One write format of a key returned by ProcessConf.get_write_formats_key.
+        :type format_key: tuple
+
+        :return: A tuple (extension, write options), or None if the output format is not valid.
+        :rtype: tuple or None
+
+        Example:
+            >>> key = ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 3}])
+            >>> ImageTools.get_write_options_by_key(key[0])
+            >>> ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 3])
+        """
+        return ImageTools.parse_write_options(
+            ProcessConf.get_write_format_by_key(format_key)
+        )
+
+    @staticmethod
+    def parse_write_options(output_format: dict) -> tuple or None:
+        """
+        Parse the extension and the cv2 write options of a valid output format.
+
+        :param output_format: The output format configuration dictionary.
+        :type output_format: dict
+
+        :return: A tuple (extension, write options), or None if the output format is not valid.
+        :rtype: tuple or None
+
+        Example:
+            >>> ImageTools.parse_write_options({'ext': '.webp'})
+            >>> ('.webp', None)
+        """
+        result = None
         if ProcessConf.is_valid_output_format(output_format):
-            ext = output_format.get('ext')
             options = None
             if ProcessConf.is_output_write_jpg_format(output_format):
                 options = ImageTools.get_jpeg_write_options(output_format)
@@ -1071,25 +1269,21 @@ class ImageTools:
                 options = ImageTools.get_webp_write_options(output_format)
             elif ProcessConf.is_output_write_png_format(output_format):
                 options = ImageTools.get_png_write_options(output_format)
-
-            result = ImageTools.write_image(
-                image=image,
-                output_path=output_path,
-                file_name=file_name,
-                ext=ext,
-                options=options
-            )
+            result = (output_format.get('ext'), options)
         return result
 
     @staticmethod
     def write_images_by_format(image: ndarray or None,
                                output_path: str,
                                file_name: str,
-                               output_formats: list
+                               output_formats: list,
+                               executor: Executor or None = None
                                ) -> bool:
         """
         Write images to the specified formats.
 
+        Formats are written in sequence, or concurrently in the given executor.
+
         :param image: The image data as a NumPy ndarray.
         :type image: ndarray or None
         :param output_path: The path to the output directory.
@@ -1098,6 +1292,8 @@ class ImageTools:
         :type file_name: str
         :param output_formats: List of output format configuration dictionaries.
         :type output_formats: list
+        :param executor: The executor writing the formats concurrently, None to write them in sequence.
+        :type executor: Executor or None, optional
 
         :return: True if the images are successfully written to the specified formats, False otherwise.
         :rtype: bool
@@ -1114,6 +1310,18 @@ class ImageTools:
         """
         result = False
         if Ut.is_list(output_formats, not_null=True):
+            if executor is not None \
+                    and len(output_formats) > 1:
+                results = executor.map(
+                    lambda write_format: ImageTools.write_image_format(
+                        image=image,
+                        output_path=output_path,
+                        file_name=file_name,
+                        output_format=write_format
+                    ),
+                    output_formats
+                )
+                return all(list(results))
             result = True
             for write_format in output_formats:
                 if not ImageTools.write_image_format(
@@ -1198,6 +1406,10 @@ class ImageTools:
         """
         Resize an image.
 
+        The missing dimension keeps the aspect ratio, with exact integer math.
+        It may be one pixel larger than with the float math of earlier releases,
+        which lost a pixel to float rounding for some sizes (e.g. 90x10 to height 7 gives 63x7, not 62x7).
+
         :param image: The image data as a NumPy ndarray.
         :type image: ndarray
         :param width: The desired width of the resized image.
@@ -1232,36 +1444,27 @@ class ImageTools:
         if width is None \
                 and Ut.is_int(h, not_null=True) \
                 and height <= h:
-            # calculate the ratio of the height and construct the
-            # dimensions
-            r = height / float(h)
-            dim = (int(w * r), height)
+            # keep the aspect ratio, exact integer floor of w * height / h
+            dim = (w * height // h, height)
 
         # otherwise, the height is None
         elif height is None \
                 and Ut.is_int(w, not_null=True) \
                 and width <= w:
-            # calculate the ratio of the width and construct the
-            # dimensions
-            r = width / float(w)
-            dim = (width, int(h * r))
+            # keep the aspect ratio, exact integer floor of h * width / w
+            dim = (width, h * width // w)
 
         else:
             raise ImgToolsException(
                 "[ImageTools::image_resize] "
                 "Error: Unable to resize image, bad sizes."
             )
-        resized = None
-        if dim is not None:
-            # resize the image
-            logger.debug(
-                "[ImageTools] Resize image from %s x %s to %s x %s pix",
-                w,
-                h,
-                dim[1],
-                dim[0]
-            )
-            resized = cv2.resize(image, dsize=dim, interpolation=inter)
-
-        # return the resized image
-        return resized
+        logger.debug(
+            "[ImageTools] Resize image from %s x %s to %s x %s pix",
+            w,
+            h,
+            dim[1],
+            dim[0]
+        )
+        # INTER_AREA by default, the best kernel for shrinking
+        return cv2.resize(image, dsize=dim, interpolation=inter)
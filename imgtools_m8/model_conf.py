@@ -1,5 +1,7 @@
 """Model Configuration class"""
+import os
 import logging
+import functools
 from enum import Enum
 from os import path as Path
 from ve_utils.utils import UType as Ut
@@ -14,7 +16,6 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
-logging.basicConfig()
 logger = logging.getLogger("imgTools_m8")
 
 
@@ -407,11 +408,44 @@ class ModelConf:
             >>> ModelConf.get_models_list('/path/to/models')
             ['model1.pb', 'model2.pb']
         """
+        mtime = None
+        if Ut.is_str(path, not_null=True):
+            # a new or removed model file changes the directory mtime
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except (OSError, ValueError):
+                mtime = None
+        if mtime is not None:
+            result = ModelConf.list_models(path, mtime)
+            return list(result) if result is not None else None
         result = ImageToolsHelper.get_files_list(path, ext='.pb')
         if Ut.is_list(result, not_null=True):
             result.sort()
         return result
 
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def list_models(path: str, mtime: int) -> tuple or None:
+        """
+        Get the sorted model file names of a directory, caching the result.
+
+        :param path: The path to the directory containing model files.
+        :type path: str
+        :param mtime: The directory modification time in nanoseconds, a new value reads the directory again.
+        :type mtime: int
+
+        :return: A tuple of sorted model file names, or None if the directory can't be listed.
+        :rtype: tuple or None
+
+        Example:
+            >>> ModelConf.list_models('/path/to/models', os.stat('/path/to/models').st_mtime_ns)
+            ('model1.pb', 'model2.pb')
+        """
+        result = ImageToolsHelper.get_files_list(path, ext='.pb')
+        if result is not None:
+            result = tuple(sorted(result))
+        return result
+
     @staticmethod
     def get_model_scale(file_name: str) -> int:
         """
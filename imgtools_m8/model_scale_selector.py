@@ -7,7 +7,8 @@ License: Apache 2 License
 Version: 1.0.0
 """
 import math
-import numpy as np
+import functools
+from operator import itemgetter
 from typing import Optional
 from ve_utils.utils import UType as Ut
 from imgtools_m8.helper import ImageToolsHelper
@@ -171,14 +172,15 @@ class ModelScaleSelector:
                 "Error: Bad model scale value. Must be > 0"
             )
 
-        while ModelScaleSelector.need_upscale(
-                width=width,
-                height=height,
-                fixed_width=fixed_width,
-                fixed_height=fixed_height):
-            width = width * model_scale
-            height = height * model_scale
-            result += 1
+        # each side is upscaled until it reaches its fixed size,
+        # the image needs the highest count of the two sides
+        for fixed_value, value in ((fixed_width, width), (fixed_height, height)):
+            if isinstance(fixed_value, int) and fixed_value >= 1:
+                nb_upscale = 0
+                while value < fixed_value:
+                    value = value * model_scale
+                    nb_upscale += 1
+                result = max(result, nb_upscale)
         return result
 
     @staticmethod
@@ -205,25 +207,55 @@ class ModelScaleSelector:
         best_combination = None
         if Ut.is_int(max_x_scale, mini=1) \
                 and Ut.is_list(available_scales, not_null=True):
-            total_combinations = ImageToolsHelper.find_all_combinations(
-                total=max_x_scale,
-                numbers=available_scales
-            )
-            nb_combinations_min = 0
-
-            for combination in total_combinations:
-                nb_scales = len(combination)
-                if nb_combinations_min == 0 or nb_scales < nb_combinations_min:
-                    nb_combinations_min = nb_scales
-
+            # images sharing the same upscale ratio reuse the search result,
+            # returned as new lists the caller can change
             best_combination = [
-                x
-                for x in total_combinations
-                if len(x) <= nb_combinations_min
+                list(x)
+                for x in ModelScaleSelector.find_scale_combinations(
+                    max_x_scale,
+                    tuple(available_scales)
+                )
             ]
-
         return best_combination
 
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def find_scale_combinations(max_x_scale: int,
+                                available_scales: tuple,
+                                ) -> tuple:
+        """
+        Find the shortest combinations of scaling factors for achieving the target upscale, caching the result.
+
+        :param max_x_scale: The target upscale value.
+        :type max_x_scale: int
+        :param available_scales: Available scaling factors.
+        :type available_scales: tuple
+
+        :return: A tuple of the shortest combinations of scaling factors, empty if not found.
+        :rtype: tuple
+
+        Example:
+            >>> ModelScaleSelector.find_scale_combinations(7, (2, 3, 4))
+            >>> ((4, 3), (3, 4))
+        """
+        result = ()
+        # fewest scales needed, then only the combinations of that length
+        # are searched, instead of all the ordered combinations
+        shortest = ImageToolsHelper.find_best_combination(
+            total=max_x_scale,
+            numbers=list(available_scales)
+        )
+        if shortest is not None:
+            result = tuple(
+                tuple(x)
+                for x in ImageToolsHelper.find_all_combinations(
+                    total=max_x_scale,
+                    numbers=list(available_scales),
+                    length=len(shortest)
+                )
+            )
+        return result
+
     @staticmethod
     def set_scale_stats(x_scale: int,
                         combination_key: int,
@@ -458,27 +490,21 @@ class ModelScaleSelector:
         result, stats, best_combination = None, None, None
         if Ut.is_list(x_scales, not_null=True) \
                 and Ut.is_list(possibilities, not_null=True):
-            all_stats = ModelScaleSelector.get_scale_combination_stats(
-                x_scales=x_scales,
-                possibilities=possibilities
-            )
-            if Ut.is_list(all_stats, not_null=True):
-                np_stats = np.array(all_stats)
-                min_stat = int(np.argmin(np_stats[1] + np_stats[2] + np_stats[3]))
-                key_sel = np_stats[0][min_stat]
-                best_combination = possibilities[key_sel]
-                # Other way to check all better combinations
-                # best_combinations = np.where(
-                #     [
-                #         (np_stats[1] == np_stats[1].min()) &
-                #         (np_stats[2] == np_stats[2].min()) &
-                #         (np_stats[3] == np_stats[3].min())
-                #     ]
-                # )
-                result, stats = ModelScaleSelector.get_scale_stats(
+            # stats of each combination are kept, so the selected one isn't computed twice
+            all_stats = [
+                ModelScaleSelector.get_scale_stats(
                     x_scales=x_scales,
-                    combination=list(best_combination)
+                    combination=list(combination)
                 )
+                for combination in possibilities
+            ]
+            # first combination with the lowest max_dif + max_scale + total_scale
+            key_sel = min(
+                range(len(all_stats)),
+                key=lambda key: sum(all_stats[key][1])
+            )
+            best_combination = possibilities[key_sel]
+            result, stats = all_stats[key_sel]
 
         return result, stats, best_combination
 
@@ -525,42 +551,45 @@ class ModelScaleSelector:
         """
         if Ut.is_list(stats, not_null=True) \
                 and Ut.is_list(scale_analytics, not_null=True) \
+                and len(scale_analytics) >= 4 \
                 and Ut.is_list(scale_analytics[0], not_null=True):
-            nb_combination = len(scale_analytics[0])
+            # analytics rows are already columns: scales, nb upscales, actual scales, scale differences
+            scales, nb_upscales, actual_scales, dif_scales = scale_analytics[:4]
+            columns = zip(scales, nb_upscales, actual_scales, dif_scales)
+            nb_combination = len(scales)
             nb_stats = len(stats)
             if nb_combination == nb_stats:
-                for key, data in enumerate(stats):
+                for data, (scale, nb_upscale, actual_scale, dif_scale) in zip(stats, columns):
                     data.update(
                         {
-                            'nb_upscale': scale_analytics[1][key],
-                            'scale': scale_analytics[0][key],
-                            'actual_scale': scale_analytics[2][key],
-                            'dif_scale': scale_analytics[3][key],
+                            'nb_upscale': nb_upscale,
+                            'scale': scale,
+                            'actual_scale': actual_scale,
+                            'dif_scale': dif_scale,
                         }
                     )
             elif nb_combination > nb_stats:
-                for key, actual_scale in enumerate(scale_analytics[2]):
-                    nb_stats = len(stats)
-                    if key < nb_stats:
+                for key, (scale, nb_upscale, actual_scale, dif_scale) in enumerate(columns):
+                    if key < len(stats):
                         x_scale = stats[key].get('x_scale')
 
                         if x_scale <= actual_scale:
                             stats[key].update(
                                 {
-                                    'nb_upscale': scale_analytics[1][key],
-                                    'scale': scale_analytics[0][key],
-                                    'actual_scale': scale_analytics[2][key],
-                                    'dif_scale': scale_analytics[3][key],
+                                    'nb_upscale': nb_upscale,
+                                    'scale': scale,
+                                    'actual_scale': actual_scale,
+                                    'dif_scale': dif_scale,
                                 }
                             )
                         else:
                             tmp = {
                                 'key': -1,
                                 'x_scale': actual_scale,
-                                'nb_upscale': scale_analytics[1][key],
-                                'scale': scale_analytics[0][key],
-                                'actual_scale': scale_analytics[2][key],
-                                'dif_scale': scale_analytics[3][key],
+                                'nb_upscale': nb_upscale,
+                                'scale': scale,
+                                'actual_scale': actual_scale,
+                                'dif_scale': dif_scale,
                             }
                             stats.insert(key, tmp)
                     else:
@@ -716,11 +745,9 @@ class ModelScaleSelector:
         h, w = size
         if Ut.is_list(output_formats, not_null=True) \
                 and Ut.is_int(model_scale, not_null=True):
-            result = {
-                'max_x_scale': 0,
-                'max_upscale': 0,
-                'stats': []
-            }
+            max_x_scale = 0
+            max_upscale = 0
+            stats = []
             for key, output_format in enumerate(output_formats):
                 fixed_height = output_format.get('fixed_height')
                 fixed_width = output_format.get('fixed_width')
@@ -735,15 +762,17 @@ class ModelScaleSelector:
                     height=h,
                     fixed_width=fixed_width,
                     fixed_height=fixed_height)
-                result['max_x_scale'] = max(result.get('max_x_scale'), x_scale)
-                result['max_upscale'] = max(result.get('max_upscale'), tmp)
-                result['stats'].append({
+                max_x_scale = max(max_x_scale, x_scale)
+                max_upscale = max(max_upscale, tmp)
+                stats.append({
                     'key': key,
                     'nb_upscale': tmp,
                     'x_scale': x_scale
                 })
-            result['stats'] = sorted(
-                result.get('stats'),
-                key=lambda d: d['x_scale']
-            )
+            stats.sort(key=itemgetter('x_scale'))
+            result = {
+                'max_x_scale': max_x_scale,
+                'max_upscale': max_upscale,
+                'stats': stats
+            }
         return result
@@ -5,9 +5,13 @@ import logging
 import multiprocessing
 import time
 import os
-from ve_utils.utils import UType as Ut
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from imgtools_m8.helper import ImageToolsHelper
 from imgtools_m8.img_tools import ImageTools
+from imgtools_m8.img_expander import ImageExpander
+from imgtools_m8.model_conf import ScaleSelector
+from imgtools_m8.worker import init_worker, run_batch
 
 __author__ = "Eli Serra"
 __copyright__ = "Copyright 2020, Eli Serra"
@@ -16,13 +20,64 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
-logging.basicConfig()
 logger = logging.getLogger("imgTools_m8")
 
+# Opt-in with IMGTOOLS_M8_FORKSERVER=1, workers are then forked from a forkserver
+# that already imported these modules. Scripts must guard their entry point.
+_FORKSERVER_ENV = "IMGTOOLS_M8_FORKSERVER"
+_PRELOAD_MODULES = ['cv2', 'numpy', 'imgtools_m8.worker']
+
+
+def _get_mp_context():
+    """
+    Get the multiprocessing context used to start the pool workers.
+
+    The platform default start method is used, unless IMGTOOLS_M8_FORKSERVER=1
+    is set where forkserver is available. Workers are then forked from a
+    forkserver that has already imported cv2, numpy and the worker module,
+    so each worker starts with them loaded. Like spawn, forkserver imports
+    the main module again in the workers, so the calling script must run
+    under an ``if __name__ == '__main__':`` guard.
+
+    :return: The multiprocessing context.
+    :rtype: multiprocessing.context.BaseContext
+    """
+    if os.environ.get(_FORKSERVER_ENV) == "1" \
+            and 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(_PRELOAD_MODULES)
+    else:
+        ctx = multiprocessing.get_context()
+    return ctx
+
+
+def _get_batches(entries: list, batch_size: int):
+    """
+    Split a list of entries in batches.
+
+    :param entries: The list to split.
+    :type entries: list
+    :param batch_size: The maximum number of entries per batch.
+    :type batch_size: int
+
+    :yield: A tuple of at most batch_size entries.
+    """
+    for start in range(0, len(entries), batch_size):
+        yield tuple(entries[start:start + batch_size])
+
 
 class MultiProcessImage(ImageTools):
     """
         MultiProcessing ImageTools
+
+        The worker pool is started on the first run that needs it and kept
+        between runs. Call close() or use the instance as a context manager
+        to stop the workers. An instance dropped without close() stops its
+        workers when it is garbage collected, or at interpreter exit.
+
+        Workers start with the platform default start method. With
+        IMGTOOLS_M8_FORKSERVER=1 they are forked from a preloading forkserver,
+        the calling script then needs an ``if __name__ == '__main__':`` guard.
     """
 
     def __init__(self,
@@ -31,6 +86,9 @@ class MultiProcessImage(ImageTools):
                  output_formats: list,
                  model_conf: dict or None = None,
                  ):
+        self._executor = None
+        self._executor_conf = None
+        self._finalizer = None
         ImageTools.__init__(self,
                             source_path=source_path,
                             output_path=output_path,
@@ -38,32 +96,163 @@ class MultiProcessImage(ImageTools):
                             model_conf=model_conf
                             )
 
+    def get_worker_conf(self) -> dict:
+        """
+        Get the configuration used to build the ImageTools instance of each worker.
+
+        :return: A dictionary of ImageTools constructor arguments.
+        :rtype: dict
+        """
+        model_conf = None
+        if self.has_expander():
+            model_conf = {
+                'path': self.expander.model_conf.get_path(),
+                'model_name': self.expander.model_conf.get_model_name(),
+                'scale': self.expander.model_conf.get_scale(),
+                'scale_selector': self.expander.model_conf.get_scale_selector()
+            }
+        result = self.conf.to_dict()
+        result.update({'model_conf': model_conf})
+        return result
+
+    @staticmethod
+    def get_executor_conf(conf: dict) -> dict:
+        """
+        Get the part of a worker configuration that requires restarting the worker pool when changed.
+
+        The source path is sent with each task, so it is left out. Of the model
+        configuration, only the model path, name and scale selector are kept,
+        with the scale only if fixed: in auto scale mode it changes at run time.
+        No model configuration is compared as the default one, that the workers build.
+
+        :param conf: The worker configuration, as returned by get_worker_conf.
+        :type conf: dict
+
+        :return: The configuration the worker pool was started with.
+        :rtype: dict
+
+        Example:
+            >>> tools = MultiProcessImage(...)
+            >>> MultiProcessImage.get_executor_conf(tools.get_worker_conf())
+        """
+        model_conf = ImageExpander(model_conf=conf.get('model_conf')).model_conf
+        is_fixed_scale = model_conf.get_scale_selector() == ScaleSelector.FIXED_SCALE
+        result = {
+            key: value
+            for key, value in conf.items()
+            if key not in ('source_path', 'model_conf')
+        }
+        result['model_conf'] = (
+            model_conf.get_path(),
+            model_conf.get_model_name(),
+            model_conf.get_scale_selector(),
+            model_conf.get_scale() if is_fixed_scale else None
+        )
+        return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """
+        Get the worker pool, started on first use and kept between runs.
+
+        Each worker builds its ImageTools instance once, in its initializer,
+        and loads the upscale model there if an output format sets a size.
+        The pool is only restarted if the configuration set changed,
+        see get_executor_conf.
+
+        :return: The worker pool.
+        :rtype: ProcessPoolExecutor
+        """
+        conf = self.get_worker_conf()
+        executor_conf = MultiProcessImage.get_executor_conf(conf)
+        if self._executor is not None \
+                and self._executor_conf != executor_conf:
+            self.close()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=multiprocessing.cpu_count(),
+                mp_context=_get_mp_context(),
+                initializer=init_worker,
+                initargs=(conf,)
+            )
+            self._executor_conf = executor_conf
+            # stop the workers if the instance is dropped without close()
+            self._finalizer = weakref.finalize(self, self._executor.shutdown, wait=False)
+        return self._executor
+
+    def close(self):
+        """
+        Stop the worker pool, if started.
+        """
+        if self._executor is not None:
+            self._finalizer.detach()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._executor_conf = None
+            self._finalizer = None
+
+    def _iter_source(self):
+        """
+        Iterate over the image files of the source directory.
+
+        Uses a single os.scandir pass, so the entry path is built by the OS
+        and no extra stat call is needed to filter regular files.
+
+        :yield: A tuple containing the image file path and the image file name.
+        """
+        with os.scandir(self.conf.get_source_path()) as entries:
+            for entry in entries:
+                if entry.is_file() \
+                        and ImageToolsHelper.is_valid_image_ext(
+                            ImageToolsHelper.get_extension(entry.name)):
+                    yield entry.path, entry.name
+
     def run_multiple(self) -> bool:
-        """Run from directory with multiprocessing"""
+        """
+        Run from directory with multiprocessing.
+
+        A single image file, or a directory containing only one image,
+        is processed in the current process without starting a pool.
+        """
         result = False
         start_time = time.time()
-        files = ImageToolsHelper.get_images_list(self.conf.get_source_path())
         if self.has_conf() \
-                and Ut.is_list(files, not_null=True) \
+                and os.path.isfile(self.conf.get_source_path()):
+            # nothing to parallelize, skip the pool setup
+            result = self.run()
+        elif self.has_conf() \
                 and os.path.isdir(self.conf.get_source_path()):
-            cpu_count = multiprocessing.cpu_count()
-            pool = multiprocessing.Pool(processes=cpu_count)
-            try:
-                prms = list()
-                for file in files:
-                    prms.append((
-                        os.path.join(self.conf.get_source_path(), file),
-                        file
-                    ))
+            entries = list(self._iter_source())
+            if len(entries) == 1:
+                result = self.process_image(
+                    source_path=entries[0][0],
+                    file_name=entries[0][1]
+                )
+            elif len(entries) > 1:
+                cpu_count = multiprocessing.cpu_count()
+                batch_size = max(1, len(entries) // (cpu_count * 8))
+                executor = self.get_executor()
                 # Multi Process Images
-                result = pool.starmap(self.process_image, prms)
-                if False in result:
-                    result = False
-                else:
-                    result = True
-            finally:
-                pool.close()
-                pool.join()
+                futures = {
+                    executor.submit(run_batch, batch): len(batch)
+                    for batch in _get_batches(entries, batch_size)
+                }
+                result = True
+                nb_done = 0
+                # handle each batch as soon as it completes, in any order
+                for future in as_completed(futures):
+                    nb_done += futures[future]
+                    if not future.result():
+                        result = False
+                    logger.debug(
+                        "Processed %s/%s images",
+                        nb_done, len(entries)
+                    )
 
         logger.debug(
             "Processing time %s sec",
@@ -1,6 +1,9 @@
 """Process Configuration class"""
 import logging
-from os import path as Path
+import os
+import stat
+import functools
+from typing import Optional
 from ve_utils.utils import UType as Ut
 from imgtools_m8.helper import ImageToolsHelper
 from imgtools_m8.exceptions import ImgToolsException
@@ -13,9 +16,25 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
-logging.basicConfig()
 logger = logging.getLogger("imgTools_m8")
 
+# Lower case extensions accepted by each write format
+_JPG_EXTS = frozenset(ImageToolsHelper.get_valid_jpg_ext())
+_WEBP_EXTS = frozenset({'.webp'})
+_PNG_EXTS = frozenset({'.png'})
+
+# Valid (min, max) integer range of each write option, by write format
+_JPG_OPTIONS = {'quality': (0, 100), 'progressive': (0, 1), 'optimize': (0, 1)}
+_WEBP_OPTIONS = {'quality': (0, 100)}
+_PNG_OPTIONS = {'compression': (0, 9)}
+# Write options by lower case extension, for all the writable formats
+_EXT_WRITE_OPTIONS = {
+    **{ext: _JPG_OPTIONS for ext in _JPG_EXTS},
+    **{ext: _WEBP_OPTIONS for ext in _WEBP_EXTS},
+    **{ext: _PNG_OPTIONS for ext in _PNG_EXTS},
+}
+_WRITE_FORMAT_KEYS = ('ext', 'quality', 'progressive', 'optimize', 'compression')
+
 
 class ProcessConf:
     """
@@ -28,6 +47,15 @@ class ProcessConf:
     :param output_path: The path to the output directory where processed images will be saved.
     :type output_path: str, optional
     """
+    # no per-instance __dict__: smaller pickles when sent to pool workers
+    __slots__ = (
+        'source_path',
+        'output_formats',
+        'output_path',
+        '_source_path_kind',
+        '_output_path_kind',
+        '_ready',
+    )
 
     def __init__(self,
                  source_path: str,
@@ -47,9 +75,13 @@ class ProcessConf:
         self.source_path = None
         self.output_formats = None
         self.output_path = None
+        self._source_path_kind = None
+        self._output_path_kind = None
+        self._ready = False
+        # cheap path checks first, then the output formats validation
         self.set_source_path(source_path)
-        self.set_output_formats(output_formats)
         self.set_output_path(output_path)
+        self.set_output_formats(output_formats)
 
     def is_ready(self) -> bool:
         """
@@ -65,7 +97,41 @@ class ProcessConf:
             >>> config.is_ready()
             True
         """
-        return self.has_source_path() \
+        return self._ready
+
+    def to_dict(self) -> dict:
+        """
+        Get the validated configuration as a dictionary of constructor arguments.
+
+        A ProcessConf built from this dictionary has the same configuration.
+
+        :return: The source_path, output_formats and output_path values.
+        :rtype: dict
+
+        Example:
+            >>> config = ProcessConf(
+            >>> source_path='path/to/source', output_formats=[{'formats': [{'ext': '.png'}]}],
+            >>> output_path='path/to/output'
+            >>> )
+            >>> config.to_dict()
+            {'source_path': 'path/to/source', 'output_formats': [{'formats': [{'ext': '.png'}]}], ...}
+        """
+        return {
+            'source_path': self.source_path,
+            'output_formats': self.output_formats,
+            'output_path': self.output_path
+        }
+
+    def _update_ready(self) -> None:
+        """
+        Refresh the cached ready state, called by each setter once its value is validated.
+
+        Example:
+            >>> config._update_ready()
+            >>> config.is_ready()
+            True
+        """
+        self._ready = self.has_source_path() \
             and self.has_output_formats() \
             and self.has_output_path()
 
@@ -81,7 +147,8 @@ class ProcessConf:
             >>> config.has_source_path()
             True
         """
-        return ProcessConf.is_source_path(self.source_path)
+        return self.source_path is not None \
+            and self._source_path_kind is not None
 
     def set_source_path(self, value: str) -> bool:
         """
@@ -100,9 +167,14 @@ class ProcessConf:
         """
         result = False
         self.source_path = None
-        if ProcessConf.is_source_path(value):
+        self._source_path_kind = None
+        path_kind = ProcessConf.get_path_kind(value)
+        if path_kind is not None:
             self.source_path = value
+            # the path is validated once, then kept as a directory or a file
+            self._source_path_kind = path_kind
             result = True
+        self._update_ready()
         return result
 
     def get_source_path(self) -> str:
@@ -153,11 +225,12 @@ class ProcessConf:
             True
         """
         self.output_formats = None
+        self._ready = False
         if ProcessConf.is_output_formats(data):
-            self.output_formats = []
+            output_formats = []
             for output_format in data:
                 conf = ProcessConf.set_output_format(output_format.get('formats'))
-                if Ut.is_dict(conf):
+                if conf is not None:
                     conf.update(ProcessConf.set_output_size(output_format))
                 else:
                     raise SettingInvalidException(
@@ -165,8 +238,9 @@ class ProcessConf:
                         "Error: Invalid output format configuration. %s",
                         output_format
                     )
-                self.output_formats.append(conf)
-            self.output_formats = data
+                output_formats.append(conf)
+            self.output_formats = output_formats
+            self._update_ready()
             result = True
         else:
             raise SettingInvalidException(
@@ -192,6 +266,26 @@ class ProcessConf:
         """
         return self.output_formats
 
+    def may_need_upscale(self) -> bool:
+        """
+        Check if an output format sets a size, so smaller images may need an upscale.
+
+        :return: True if an output format sets a fixed width, height or scale, False otherwise.
+        :rtype: bool
+
+        Example:
+            >>> config = ProcessConf(output_formats=[{'fixed_width': 800, 'formats': [{'ext': '.jpg'}]}])
+            >>> config.may_need_upscale()
+            True
+        """
+        return Ut.is_list(self.output_formats, not_null=True) \
+            and any(
+                output_format.get(key) is not None
+                for output_format in self.output_formats
+                # fixed_size is set as fixed_width and fixed_height
+                for key in ('fixed_width', 'fixed_height', 'fixed_scale')
+            )
+
     def has_output_path(self) -> bool:
         """
         Check if the instance has a valid output path.
@@ -205,7 +299,8 @@ class ProcessConf:
             >>> config.has_output_path()
             True
         """
-        return ProcessConf.is_output_path(self.output_path)
+        return self.output_path is not None \
+            and self._output_path_kind is not None
 
     def set_output_path(self, value: str) -> bool:
         """
@@ -224,9 +319,12 @@ class ProcessConf:
         """
         result = False
         self.output_path = None
-        if ProcessConf.is_output_path(value):
+        self._output_path_kind = None
+        if ProcessConf.get_path_kind(value) == 'dir':
             self.output_path = value
+            self._output_path_kind = 'dir'
             result = True
+        self._update_ready()
         return result
 
     def get_output_path(self) -> str:
@@ -244,6 +342,33 @@ class ProcessConf:
         """
         return self.output_path
 
+    @staticmethod
+    def get_path_kind(value: str) -> Optional[str]:
+        """
+        Get the kind of file system entry found at a given path, using a single stat call.
+
+        :param value: The path to check.
+        :type value: str
+
+        :return: 'dir' for a directory, 'file' for a regular file, None otherwise.
+        :rtype: str or None
+
+        Example:
+            >>> ProcessConf.get_path_kind("/path/to/images")
+            'dir'
+        """
+        result = None
+        if Ut.is_str(value, not_null=True):
+            try:
+                mode = os.stat(value).st_mode
+            except (OSError, ValueError):
+                mode = 0
+            if stat.S_ISDIR(mode):
+                result = 'dir'
+            elif stat.S_ISREG(mode):
+                result = 'file'
+        return result
+
     @staticmethod
     def is_source_path(source_path: str) -> bool:
         """
@@ -259,9 +384,7 @@ class ProcessConf:
             >>> ProcessConf.is_source_path("/path/to/images")
             True
         """
-        return Ut.is_str(source_path, not_null=True) \
-            and (Path.isdir(source_path)
-                 or Path.isfile(source_path))
+        return ProcessConf.get_path_kind(source_path) is not None
 
     @staticmethod
     def is_output_path(output_path: str) -> bool:
@@ -278,8 +401,7 @@ class ProcessConf:
             >>> ProcessConf.is_output_path("/path/to/output")
             True
         """
-        return Ut.is_str(output_path, not_null=True) \
-            and Path.isdir(output_path)
+        return ProcessConf.get_path_kind(output_path) == 'dir'
 
     @staticmethod
     def is_output_formats(output_formats: list) -> bool:
@@ -316,18 +438,24 @@ class ProcessConf:
             >>> ProcessConf.is_fixed_width_or_height(config_data)
             True
         """
-        is_not_fixed_width_or_height = data.get('fixed_height') is None \
-            and data.get('fixed_width') is None
-
-        is_fixed_width_or_height = (Ut.is_int(data.get('fixed_width'), mini=1)
-                                    and Ut.is_int(data.get('fixed_height'), mini=1)) \
-            or (Ut.is_int(data.get('fixed_width'), mini=1)
-                and data.get('fixed_height') is None) \
-            or (Ut.is_int(data.get('fixed_height'), mini=1)
-                and data.get('fixed_width') is None)
-
-        is_combined = data.get('fixed_size') is None \
-            and data.get('fixed_scale') is None
+        fixed_width = data.get('fixed_width')
+        fixed_height = data.get('fixed_height')
+        fixed_size = data.get('fixed_size')
+        fixed_scale = data.get('fixed_scale')
+        is_not_fixed_width_or_height = fixed_height is None \
+            and fixed_width is None
+
+        is_fixed_width = isinstance(fixed_width, int) and fixed_width >= 1
+        is_fixed_height = isinstance(fixed_height, int) and fixed_height >= 1
+        is_fixed_width_or_height = (is_fixed_width
+                                    and is_fixed_height) \
+            or (is_fixed_width
+                and fixed_height is None) \
+            or (is_fixed_height
+                and fixed_width is None)
+
+        is_combined = fixed_size is None \
+            and fixed_scale is None
 
         is_valid = is_fixed_width_or_height \
             and is_combined
@@ -364,13 +492,17 @@ class ProcessConf:
             >>> ProcessConf.is_fixed_size(config_data)
             True
         """
-        is_not_fixed_size = data.get('fixed_size') is None
+        fixed_width = data.get('fixed_width')
+        fixed_height = data.get('fixed_height')
+        fixed_size = data.get('fixed_size')
+        fixed_scale = data.get('fixed_scale')
+        is_not_fixed_size = fixed_size is None
 
-        is_fixed_size = Ut.is_int(data.get('fixed_size'), mini=1)
+        is_fixed_size = isinstance(fixed_size, int) and fixed_size >= 1
 
-        is_combined = data.get('fixed_width') is None \
-            and data.get('fixed_height') is None \
-            and data.get('fixed_scale') is None
+        is_combined = fixed_width is None \
+            and fixed_height is None \
+            and fixed_scale is None
 
         is_valid = is_fixed_size \
             and is_combined
@@ -406,7 +538,8 @@ class ProcessConf:
             >>> ProcessConf.is_fixed_scale_value(config_data)
             True
         """
-        return Ut.is_int(data.get('fixed_scale'), mini=2, maxi=10)
+        fixed_scale = data.get('fixed_scale')
+        return isinstance(fixed_scale, int) and 2 <= fixed_scale <= 10
 
     @staticmethod
     def is_fixed_scale(data: dict) -> bool:
@@ -430,14 +563,18 @@ class ProcessConf:
             >>> ProcessConf.is_fixed_scale(output_format)
             >>> True
         """
-        is_not_fixed_scale = data.get('fixed_scale') is None
+        fixed_width = data.get('fixed_width')
+        fixed_height = data.get('fixed_height')
+        fixed_size = data.get('fixed_size')
+        fixed_scale = data.get('fixed_scale')
+        is_not_fixed_scale = fixed_scale is None
 
-        is_fixed_scale = ProcessConf.is_fixed_scale_value(data) \
-            or data.get('fixed_scale') is None
+        is_fixed_scale = is_not_fixed_scale \
+            or ProcessConf.is_fixed_scale_value(data)
 
-        is_combined = data.get('fixed_width') is None \
-            and data.get('fixed_height') is None \
-            and data.get('fixed_size') is None
+        is_combined = fixed_width is None \
+            and fixed_height is None \
+            and fixed_size is None
 
         is_valid = is_fixed_scale \
             and is_combined
@@ -462,6 +599,8 @@ class ProcessConf:
         """
         Set the output size configuration based on the provided output format data.
 
+        Size options already resolved are read from a cache.
+
         :param output_format: The output format data.
         :type output_format: dict
 
@@ -476,24 +615,136 @@ class ProcessConf:
             >>> {'fixed_scale': 2}
         """
         result = {}
-        if Ut.is_dict(output_format, not_null=True):
-            if ProcessConf.is_fixed_width_or_height(output_format):
-                result.update({
-                    'fixed_width': output_format.get('fixed_width'),
-                    'fixed_height': output_format.get('fixed_height')
-                })
-            elif ProcessConf.is_fixed_size(output_format):
-                result.update({
-                    'fixed_width': output_format.get('fixed_size'),
-                    'fixed_height': output_format.get('fixed_size')
-                })
-            elif ProcessConf.is_fixed_scale(output_format):
-                result.update({
-                    'fixed_scale': output_format.get('fixed_scale')
-                })
+        if isinstance(output_format, dict) and output_format:
+            # scan the size options once, then branch on the keys set
+            sizes = {
+                key: output_format.get(key)
+                for key in ('fixed_width', 'fixed_height', 'fixed_size', 'fixed_scale')
+                if output_format.get(key) is not None
+            }
+            try:
+                # values are keyed with their type, so True and 1 get different keys
+                key = frozenset(
+                    (size_key, type(value), value)
+                    for size_key, value in sizes.items()
+                )
+            except TypeError:
+                key = None
+            if key is not None:
+                result.update(ProcessConf.get_output_size_by_key(key))
+            else:
+                result.update(ProcessConf.get_output_size(sizes))
+        return result
+
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def get_output_size_by_key(key: frozenset) -> dict:
+        """
+        Get the output size configuration of size options, caching the result.
+
+        The dictionary returned is shared between calls, it must not be modified.
+
+        :param key: The (option, type, value) tuples of the fixed_* options set.
+        :type key: frozenset
+
+        :return: A dictionary containing the output size configuration.
+        :rtype: dict
+
+        :raises SettingInvalidException: If a size option is invalid or mixed with an other option.
+
+        Example:
+            >>> ProcessConf.get_output_size_by_key(frozenset({('fixed_scale', int, 2)}))
+            >>> {'fixed_scale': 2}
+        """
+        return ProcessConf.get_output_size(
+            {size_key: value for size_key, _, value in key}
+        )
+
+    @staticmethod
+    def get_output_size(sizes: dict) -> dict:
+        """
+        Validate the size options of an output format and get its output size configuration.
+
+        Options are checked by is_fixed_width_or_height, is_fixed_size and is_fixed_scale.
+
+        :param sizes: The fixed_* options set in the output format.
+        :type sizes: dict
+
+        :return: A dictionary containing the output size configuration.
+        :rtype: dict
 
+        :raises SettingInvalidException: If a size option is invalid or mixed with an other option.
+
+        Example:
+            >>> ProcessConf.get_output_size({'fixed_size': 260})
+            >>> {'fixed_width': 260, 'fixed_height': 260}
+        """
+        result = {}
+        if ProcessConf.is_fixed_width_or_height(sizes):
+            result.update({
+                'fixed_width': sizes.get('fixed_width'),
+                'fixed_height': sizes.get('fixed_height')
+            })
+        elif ProcessConf.is_fixed_size(sizes):
+            result.update({
+                'fixed_width': sizes.get('fixed_size'),
+                'fixed_height': sizes.get('fixed_size')
+            })
+        elif ProcessConf.is_fixed_scale(sizes):
+            result.update({
+                'fixed_scale': sizes.get('fixed_scale')
+            })
         return result
 
+    @staticmethod
+    def is_ext_in(ext: str, extensions: frozenset) -> bool:
+        """
+        Check if a file extension is in a set of lower case extensions.
+
+        Extensions normalized by set_output_format match without any case conversion.
+
+        :param ext: The file extension to check.
+        :type ext: str
+        :param extensions: The set of valid lower case extensions.
+        :type extensions: frozenset
+
+        :return: True if the extension is in the set, False otherwise.
+        :rtype: bool
+
+        Example:
+            >>> ProcessConf.is_ext_in('.PNG', frozenset({'.png'}))
+            >>> True
+        """
+        return isinstance(ext, str) \
+            and (ext in extensions
+                 or ext.lower() in extensions)
+
+    @staticmethod
+    def is_write_options(data: dict, options: dict) -> bool:
+        """
+        Check if the write options of an output configuration are in their valid range.
+
+        Options missing from the configuration are valid.
+
+        :param data: The output configuration data.
+        :type data: dict
+        :param options: The (min, max) integer range of each option.
+        :type options: dict
+
+        :return: True if all the options are valid, False otherwise.
+        :rtype: bool
+
+        Example:
+            >>> ProcessConf.is_write_options({'ext': '.png', 'compression': 6}, {'compression': (0, 9)})
+            >>> True
+        """
+        for key, (mini, maxi) in options.items():
+            value = data.get(key)
+            if value is not None \
+                    and not (isinstance(value, int) and mini <= value <= maxi):
+                return False
+        return True
+
     @staticmethod
     def is_output_write_jpg_format(data: dict) -> bool:
         """
@@ -510,14 +761,8 @@ class ProcessConf:
             >>> ProcessConf.is_output_write_jpg_format(config)
             >>> True
         """
-        return Ut.is_str(data.get('ext')) \
-            and ImageToolsHelper.is_valid_jpg_ext(data.get('ext')) \
-            and (Ut.is_int(data.get('quality'), mini=0, maxi=100)
-                 or data.get('quality') is None) \
-            and (Ut.is_int(data.get('progressive'), mini=0, maxi=1)
-                 or data.get('progressive') is None) \
-            and (Ut.is_int(data.get('optimize'), mini=0, maxi=1)
-                 or data.get('optimize') is None)
+        return ProcessConf.is_ext_in(data.get('ext'), _JPG_EXTS) \
+            and ProcessConf.is_write_options(data, _JPG_OPTIONS)
 
     @staticmethod
     def is_output_write_webp_format(data: dict) -> bool:
@@ -535,10 +780,8 @@ class ProcessConf:
             >>> ProcessConf.is_output_write_webp_format(config)
             >>> True
         """
-        return Ut.is_str(data.get('ext')) \
-            and data.get('ext').lower() == '.webp' \
-            and (Ut.is_int(data.get('quality'), mini=0, maxi=100)
-                 or data.get('quality') is None)
+        return ProcessConf.is_ext_in(data.get('ext'), _WEBP_EXTS) \
+            and ProcessConf.is_write_options(data, _WEBP_OPTIONS)
 
     @staticmethod
     def is_output_write_png_format(data: dict) -> bool:
@@ -556,10 +799,8 @@ class ProcessConf:
             >>> ProcessConf.is_output_write_png_format(config)
             >>> True
         """
-        return Ut.is_str(data.get('ext')) \
-            and data.get('ext').lower() == '.png' \
-            and (Ut.is_int(data.get('compression'), mini=0, maxi=9)
-                 or data.get('compression') is None)
+        return ProcessConf.is_ext_in(data.get('ext'), _PNG_EXTS) \
+            and ProcessConf.is_write_options(data, _PNG_OPTIONS)
 
     @staticmethod
     def is_valid_output_format(data: dict) -> bool:
@@ -577,16 +818,98 @@ class ProcessConf:
             >>> ProcessConf.is_valid_output_format(config)
             >>> True
         """
-        return ImageToolsHelper.is_valid_image_ext(data.get('ext')) \
-            and (ProcessConf.is_output_write_jpg_format(data)
-                 or ProcessConf.is_output_write_webp_format(data)
-                 or ProcessConf.is_output_write_png_format(data))
+        ext = data.get('ext')
+        options = _EXT_WRITE_OPTIONS.get(ext.lower()) if isinstance(ext, str) else None
+        return options is not None \
+            and ProcessConf.is_write_options(data, options)
 
     @staticmethod
-    def set_output_format(write_formats: list) -> dict or None:
+    def get_write_formats_key(write_formats: list) -> Optional[tuple]:
+        """
+        Get a hashable key identifying the options of a list of write formats.
+
+        Values are keyed with their type, so 1 and 1.0 get different keys.
+
+        :param write_formats: List of output formats to be written.
+        :type write_formats: list
+
+        :return: The key, or None if the write formats can't be keyed.
+        :rtype: tuple or None
+
+        Example:
+            >>> ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 6}])
+            >>> (((<class 'str'>, '.png'), (<class 'NoneType'>, None), ...),)
+        """
+        result = None
+        if all(isinstance(write_format, dict) for write_format in write_formats):
+            try:
+                result = tuple(
+                    tuple(
+                        (type(write_format.get(key)), write_format.get(key))
+                        for key in _WRITE_FORMAT_KEYS
+                    )
+                    for write_format in write_formats
+                )
+                hash(result)
+            except TypeError:
+                result = None
+        return result
+
+    @staticmethod
+    def get_write_format_by_key(format_key: tuple) -> dict:
+        """
+        Get the write format options identified by the key of one write format.
+
+        :param format_key: One write format of a key returned by get_write_formats_key.
+        :type format_key: tuple
+
+        :return: The write format options set.
+        :rtype: dict
+
+        Example:
+            >>> key = ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 6}])
+            >>> ProcessConf.get_write_format_by_key(key[0])
+            >>> {'ext': '.png', 'compression': 6}
+        """
+        return {
+            option: value
+            for option, (_, value) in zip(_WRITE_FORMAT_KEYS, format_key)
+            if value is not None
+        }
+
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def is_valid_write_formats_key(key: tuple) -> bool:
+        """
+        Check if the write formats identified by a key are all valid, caching the result.
+
+        :param key: The write formats key, as returned by get_write_formats_key.
+        :type key: tuple
+
+        :return: True if all the write formats are valid, False otherwise.
+        :rtype: bool
+
+        Example:
+            >>> key = ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 6}])
+            >>> ProcessConf.is_valid_write_formats_key(key)
+            >>> True
+        """
+        return all(
+            ProcessConf.is_valid_output_format(
+                ProcessConf.get_write_format_by_key(format_key)
+            )
+            for format_key in key
+        )
+
+    @staticmethod
+    def set_output_format(write_formats: list) -> Optional[dict]:
         """
         Set the write_format configuration.
 
+        Extensions of valid write formats are normalized to lower case,
+        in copies of the write formats given.
+        Lists of write formats already validated are not checked again.
+
         :param write_formats: List of output formats to be written.
         :type write_formats: list
 
@@ -599,14 +922,23 @@ class ProcessConf:
             >>> {'formats': [{'ext': '.jpg', 'quality': 90}, {'ext': '.png', 'compression': 6}]}
         """
         result = None
-        if Ut.is_list(write_formats, not_null=True):
-            for write_format in write_formats:
-                if not ProcessConf.is_valid_output_format(write_format):
-                    raise SettingInvalidException(
-                        "[ImageTools::set_output_format] "
-                        "Error: Invalid output format configuration. "
-                        "Bad extensions or write output options: %s",
-                        write_format
-                    )
-            result = {'formats': write_formats}
+        if isinstance(write_formats, list) and write_formats:
+            key = ProcessConf.get_write_formats_key(write_formats)
+            if key is None or not ProcessConf.is_valid_write_formats_key(key):
+                for write_format in write_formats:
+                    if not ProcessConf.is_valid_output_format(write_format):
+                        raise SettingInvalidException(
+                            "[ImageTools::set_output_format] "
+                            "Error: Invalid output format configuration. "
+                            "Bad extensions or write output options: %s",
+                            write_format
+                        )
+            # normalized copies, so write checks match without case conversion
+            # and the caller's write formats are left unchanged
+            result = {
+                'formats': [
+                    dict(write_format, ext=write_format.get('ext').lower())
+                    for write_format in write_formats
+                ]
+            }
         return result
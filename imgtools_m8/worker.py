@@ -0,0 +1,90 @@
+"""
+ImgTools_m8 multiprocessing worker functions.
+
+Functions run in the pool worker processes. Each worker holds its own
+ImageTools instance, built once from a plain configuration dictionary,
+so only (source_path, file_name) tuples are pickled per task.
+"""
+from imgtools_m8.img_tools import ImageTools
+
+__author__ = "Eli Serra"
+__copyright__ = "Copyright 2020, Eli Serra"
+__deprecated__ = False
+__license__ = "Apache Software License"
+__status__ = "Production"
+__version__ = "1.0.0"
+
+# ImageTools instance of the current worker process, set by init_worker
+_TOOLS = None
+
+
+def init_worker(conf: dict):
+    """
+    Initialize a worker process.
+
+    Build the worker ImageTools instance once, at pool startup,
+    and load the upscale model if an output format sets a size,
+    so the first upscale of each worker doesn't pay for it.
+    Workers that only convert formats never load it.
+
+    :param conf: The ImageTools configuration, as returned by MultiProcessImage.get_worker_conf.
+    :type conf: dict
+
+    Example:
+        >>> init_worker({
+        >>>     'source_path': 'input_images',
+        >>>     'output_path': 'output_images',
+        >>>     'output_formats': [{'fixed_width': 200, 'formats': [{'ext': '.jpg'}]}],
+        >>>     'model_conf': None
+        >>> })
+    """
+    global _TOOLS
+    _TOOLS = ImageTools(**conf)
+    if _TOOLS.conf.may_need_upscale():
+        _TOOLS.init_expander_model()
+
+
+def run_one(source_path: str, file_name: str) -> bool:
+    """
+    Process an image with the worker ImageTools instance.
+
+    :param source_path: The path to the source image file.
+    :type source_path: str
+    :param file_name: The base file name for the output images.
+    :type file_name: str
+
+    :return: True if the image is processed successfully, False otherwise.
+    :rtype: bool
+
+    Example:
+        >>> run_one('input_images/image.jpg', 'image.jpg')
+        True
+    """
+    return _TOOLS.process_image(
+        source_path=source_path,
+        file_name=file_name
+    )
+
+
+def run_batch(batch: tuple) -> bool:
+    """
+    Process a batch of images with the worker ImageTools instance.
+
+    Grouping images per task reduces pickle and IPC round trips,
+    and only one result is sent back for the whole batch.
+
+    :param batch: A tuple of (source_path, file_name) tuples.
+    :type batch: tuple
+
+    :return: True if all the images are processed successfully, False otherwise.
+    :rtype: bool
+
+    Example:
+        >>> run_batch((('input_images/a.jpg', 'a.jpg'), ('input_images/b.jpg', 'b.jpg')))
+        True
+    """
+    result = True
+    for source_path, file_name in batch:
+        if not run_one(source_path, file_name):
+            result = False
+    return result
@@ -1,3 +1,4 @@
+import os
 import pathlib
 from setuptools import setup
 
@@ -5,7 +6,20 @@ from setuptools import setup
 HERE = pathlib.Path(__file__).parent
 
 # The text of the README file
-README = (HERE / "README.md").read_text()
+try:
+    README = (HERE / "README.md").read_text(encoding="utf-8")
+except OSError:
+    README = ""
+
+# Optionally compile the pure-python configuration validators with Cython.
+# Opt-in with IMGTOOLS_M8_CYTHON=1, the package works the same without it.
+EXT_MODULES = []
+if os.environ.get("IMGTOOLS_M8_CYTHON") == "1":
+    from Cython.Build import cythonize
+    EXT_MODULES = cythonize(
+        ["imgtools_m8/process_conf.py"],
+        compiler_directives={"language_level": "3"}
+    )
 
 setup(
     name='imgtools_m8',
@@ -49,5 +63,6 @@ setup(
               ]
       },
     python_requires='>3.5.2',
+    ext_modules=EXT_MODULES,
     zip_safe=False
 )
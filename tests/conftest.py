@@ -0,0 +1,64 @@
+"""
+Shared pytest fixtures.
+
+Use pytest package.
+"""
+import cv2
+import pytest
+from .helper import HelperTest
+from imgtools_m8.img_tools import ImageTools
+
+__author__ = "Eli Serra"
+__copyright__ = "Copyright 2020, Eli Serra"
+__deprecated__ = False
+__license__ = "Apache Software License"
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+def pytest_configure(config):
+    """
+    Initialize OpenCV once, before the tests run.
+
+    Creating a super resolution instance probes the dnn backends, so the
+    first test using a model doesn't pay for it.
+    """
+    cv2.dnn_superres.DnnSuperResImpl_create()
+
+
+def _read_source_image(file_name: str):
+    """Decode a source test image once, as a read only array."""
+    image = ImageTools.read_image(
+        HelperTest.get_source_file(file_name)
+    )
+    image.flags.writeable = False
+    return image
+
+
+@pytest.fixture(scope="session")
+def recien_llegado_image():
+    """Decoded recien_llegado.jpg source image."""
+    return _read_source_image('recien_llegado.jpg')
+
+
+@pytest.fixture(scope="session")
+def recien_llegado_min_image():
+    """Decoded recien_llegado_min.jpg source image."""
+    return _read_source_image('recien_llegado_min.jpg')
+
+
+@pytest.fixture(scope="session")
+def recien_llegado_min_reduced_image():
+    """recien_llegado_min.jpg source image, decoded at half its size."""
+    image = cv2.imread(
+        HelperTest.get_source_file('recien_llegado_min.jpg'),
+        cv2.IMREAD_REDUCED_COLOR_2
+    )
+    image.flags.writeable = False
+    return image
+
+
+@pytest.fixture(scope="session")
+def mar_image():
+    """Decoded mar.jpg source image."""
+    return _read_source_image('mar.jpg')
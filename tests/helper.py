@@ -11,15 +11,25 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
+_TESTS_PATH = os.path.dirname(__file__)
+_SOURCE_PATH = os.path.join(_TESTS_PATH, 'sources_test')
+_OUTPUT_PATH = os.path.join(_TESTS_PATH, 'output_test')
+_SOURCE_PREFIX = _SOURCE_PATH + os.sep
+
 
 class HelperTest:
 
     @staticmethod
     def get_source_path() -> str or None:
         """Get package models' path."""
-        return os.path.join(os.path.dirname(__file__), 'sources_test')
+        return _SOURCE_PATH
 
     @staticmethod
     def get_output_path() -> str or None:
         """Get package models' path."""
-        return os.path.join(os.path.dirname(__file__), 'output_test')
+        return _OUTPUT_PATH
+
+    @staticmethod
+    def get_source_file(file_name: str) -> str:
+        """Get the path of a file in the source test directory."""
+        return _SOURCE_PREFIX + file_name
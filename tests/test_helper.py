@@ -3,7 +3,6 @@ ImageToolsHelper unittest class.
 
 Use pytest package.
 """
-import os
 import cv2
 import pytest
 from .helper import HelperTest
@@ -18,79 +17,116 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
+CUT_FILE_NAME_CASES = (
+    ('EDSR_x2.pb', 1, ('EDSR_x2', '.pb')),
+    ('img.jpg', 1, ('img', '.jpg')),
+    ('IMG.JPG', 1, ('IMG', '.jpg')),
+    ('img.jpg.jpg', 1, ('img.jpg', '.jpg')),
+    ('img', 1, ('img', '')),
+    ('img.tar.gz', 1, ('img.tar', '.gz')),
+    ('img.back.tar.gz', 2, ('img.back', '.tar.gz')),
+    ('img.back.tar.gz', 0, ('img', '.back.tar.gz')),
+)
+
+GET_EXTENSION_CASES = (
+    ('EDSR_x2.pb', 1, '.pb'),
+    ('EDSR_x2.Pb', 1, '.pb'),
+    ('img.jpg', 1, '.jpg'),
+    ('img', 1, ''),
+    ('img.tar.gz', 1, '.gz'),
+    ('img.back.tar.gz', 2, '.tar.gz'),
+    ('img.tar.gz.sav', 3, '.tar.gz.sav'),
+    ('img.tAr.gZ.sAv', 3, '.tar.gz.sav'),
+    ('img.tar.gz', 3, '.tar.gz'),
+    ('/path/to/img.back.tar.gz', 0, '.back.tar.gz'),
+)
+
 
 class TestImageToolsHelper:
 
     @staticmethod
-    def test_find_best_combination():
+    @pytest.mark.parametrize("total, numbers, expected", [
+        (0, [2, 3, 4], []),
+        (2, [2, 3, 4], [2]),
+        (4, [2, 3, 4], [4]),
+        (5, [2, 3, 4], [3, 2]),
+        (8, [2, 3, 4], [4, 4]),
+        (10, [2, 3, 4], [4, 4, 2]),
+        (15, [2, 3, 4], [4, 4, 4, 3]),
+    ])
+    def test_find_best_combination(total, numbers, expected):
         """Test find_best_combination method"""
-        args = [
-            {'total': 0, 'numbers': [2, 3, 4]},
-            {'total': 2, 'numbers': [2, 3, 4]},
-            {'total': 4, 'numbers': [2, 3, 4]},
-            {'total': 5, 'numbers': [2, 3, 4]},
-            {'total': 8, 'numbers': [2, 3, 4]},
-            {'total': 10, 'numbers': [2, 3, 4]},
-            {'total': 15, 'numbers': [2, 3, 4]},
-        ]
-        results = []
-        for params in args:
-            tmp = ImageToolsHelper.find_best_combination(**params)
-            results.append(tmp)
-        assert results == [[], [2], [4], [3, 2], [4, 4], [4, 4, 2], [4, 4, 4, 3]]
-
-        with pytest.raises(ImgToolsException):
-            ImageToolsHelper.find_best_combination(
-                total=-1,
-                numbers=[2, 3, 4]
-            )
+        assert ImageToolsHelper.find_best_combination(
+            total=total,
+            numbers=numbers
+        ) == expected
 
+    @staticmethod
+    @pytest.mark.parametrize("total, numbers", [
+        (-1, [2, 3, 4]),
+        (0, []),
+    ])
+    def test_find_best_combination_errors(total, numbers):
+        """Test find_best_combination method errors"""
         with pytest.raises(ImgToolsException):
             ImageToolsHelper.find_best_combination(
-                total=0,
-                numbers=[]
+                total=total,
+                numbers=numbers
             )
 
     @staticmethod
-    def test_find_all_combinations():
+    @pytest.mark.parametrize("total, numbers, expected", [
+        (5, [2, 3, 4], [[3, 2], [2, 3]]),
+        (7, [2, 3, 4], [[3, 2, 2], [2, 3, 2], [2, 2, 3], [4, 3], [3, 4]]),
+    ])
+    def test_find_all_combinations(total, numbers, expected):
         """Test find_all_combinations method"""
-        args = [
-            {'total': 5, 'numbers': [2, 3, 4]},
-            {'total': 7, 'numbers': [2, 3, 4]},
-        ]
-        results = []
-        for params in args:
-            tmp = ImageToolsHelper.find_all_combinations(**params)
-            results.append(tmp)
-        assert results == [[[3, 2], [2, 3]], [[3, 2, 2], [2, 3, 2], [2, 2, 3], [4, 3], [3, 4]]]
-        with pytest.raises(ImgToolsException):
-            ImageToolsHelper.find_all_combinations(
-                total=-1,
-                numbers=[2, 3, 4]
-            )
+        assert ImageToolsHelper.find_all_combinations(
+            total=total,
+            numbers=numbers
+        ) == expected
+
+    @staticmethod
+    @pytest.mark.parametrize("total, numbers, length, expected", [
+        (5, [1, 2, 3], 2, [[3, 2], [2, 3]]),
+        (7, [2, 3, 4], 2, [[4, 3], [3, 4]]),
+        (7, [2, 3, 4], 3, [[3, 2, 2], [2, 3, 2], [2, 2, 3]]),
+        (7, [2, 3, 4], 1, []),
+    ])
+    def test_find_all_combinations_length(total, numbers, length, expected):
+        """Test find_all_combinations method with a combinations length"""
+        assert ImageToolsHelper.find_all_combinations(
+            total=total,
+            numbers=numbers,
+            length=length
+        ) == expected
 
+    @staticmethod
+    @pytest.mark.parametrize("total, numbers, length", [
+        (-1, [2, 3, 4], None),
+        (0, [], None),
+        (5, [2, 3, 4], -1),
+    ])
+    def test_find_all_combinations_errors(total, numbers, length):
+        """Test find_all_combinations method errors"""
         with pytest.raises(ImgToolsException):
             ImageToolsHelper.find_all_combinations(
-                total=0,
-                numbers=[]
+                total=total,
+                numbers=numbers,
+                length=length
             )
 
     @staticmethod
-    def test_is_image_size():
+    @pytest.mark.parametrize("size, expected", [
+        ((-1, 220), False),
+        ((0, 220), False),
+        ((220, -1), False),
+        ((220, 0), False),
+        ((320, 220), True),
+    ])
+    def test_is_image_size(size, expected):
         """Test is_image_size method"""
-        args = [
-            {'size': (-1, 220)},
-            {'size': (0, 220)},
-            {'size': (220, -1)},
-            {'size': (220, 0)},
-            {'size': (320, 220)},
-        ]
-        results = []
-        for params in args:
-            tmp = ImageToolsHelper.is_image_size(**params)
-            results.append(tmp)
-
-        assert results == [False, False, False, False, True]
+        assert ImageToolsHelper.is_image_size(size=size) is expected
 
     @staticmethod
     def test_get_images_list():
@@ -112,6 +148,9 @@ class TestImageToolsHelper:
         assert len(files) == 6
         files = ImageToolsHelper.get_files_list(sources, ext='.jpg', content_name="bad_")
         assert len(files) == 1 and files[0] == "bad_image.jpg"
+        # extensions filters are case insensitive
+        assert len(ImageToolsHelper.get_files_list(sources, ext=['.JPG', '.txt'])) == 6
+        assert len(ImageToolsHelper.get_files_list(sources, ext='.Jpg')) == 4
 
     @staticmethod
     def test_is_valid_image_ext():
@@ -122,42 +161,34 @@ class TestImageToolsHelper:
         assert ImageToolsHelper.is_valid_image_ext(ext='.jPeG')
         assert ImageToolsHelper.is_valid_image_ext(ext='.jPG')
         assert ImageToolsHelper.is_valid_image_ext(ext='.png')
+        assert not ImageToolsHelper.is_valid_image_ext(ext=None)
+        assert not ImageToolsHelper.is_valid_image_ext(ext=['.png'])
 
     @staticmethod
     def test_is_valid_jpg_ext():
         """Test is_valid_jpg_ext method"""
         assert ImageToolsHelper.is_valid_jpg_ext('.JpEg') is True
+        assert ImageToolsHelper.is_valid_jpg_ext('.png') is False
+        assert ImageToolsHelper.is_valid_jpg_ext(None) is False
+        assert ImageToolsHelper.is_valid_jpg_ext(['.jpg']) is False
 
     @staticmethod
-    def test_cut_file_name():
+    @pytest.mark.parametrize("file_name, ext_len, expected", CUT_FILE_NAME_CASES)
+    def test_cut_file_name(file_name, ext_len, expected):
         """Test cut_file_name method"""
-        assert ImageToolsHelper.cut_file_name(file_name='EDSR_x2.pb') == ('EDSR_x2', '.pb')
-        assert ImageToolsHelper.cut_file_name(file_name='img.jpg') == ('img', '.jpg')
-        assert ImageToolsHelper.cut_file_name(file_name='img') == ('img', '')
-        assert ImageToolsHelper.cut_file_name(file_name='img.tar.gz') == ('img.tar', '.gz')
-        assert ImageToolsHelper.cut_file_name(file_name='img.back.tar.gz', ext_len=2) == ('img.back', '.tar.gz')
-        assert ImageToolsHelper.cut_file_name(file_name='img.back.tar.gz', ext_len=0) == ('img', '.back.tar.gz')
+        assert ImageToolsHelper.cut_file_name(file_name=file_name, ext_len=ext_len) == expected
 
     @staticmethod
-    def test_get_extension():
+    @pytest.mark.parametrize("path, ext_len, expected", GET_EXTENSION_CASES)
+    def test_get_extension(path, ext_len, expected):
         """Test get_extension method"""
-        assert ImageToolsHelper.get_extension(path='EDSR_x2.pb') == '.pb'
-        assert ImageToolsHelper.get_extension(path='EDSR_x2.Pb') == '.pb'
-        assert ImageToolsHelper.get_extension(path='img.jpg') == '.jpg'
-        assert ImageToolsHelper.get_extension(path='img') == ''
-        assert ImageToolsHelper.get_extension(path='img.tar.gz') == '.gz'
-        assert ImageToolsHelper.get_extension(path='img.back.tar.gz', ext_len=2) == '.tar.gz'
-        assert ImageToolsHelper.get_extension(path='img.tar.gz.sav', ext_len=3) == '.tar.gz.sav'
-        assert ImageToolsHelper.get_extension(path='img.tAr.gZ.sAv', ext_len=3) == '.tar.gz.sav'
-        assert ImageToolsHelper.get_extension(path='img.tar.gz', ext_len=3) == '.tar.gz'
+        assert ImageToolsHelper.get_extension(path=path, ext_len=ext_len) == expected
 
     @staticmethod
     def test_get_image_size():
         """Test get_image_size method"""
         image = cv2.imread(
-            os.path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado.jpg')
+            HelperTest.get_source_file('recien_llegado.jpg')
         )
         assert ImageToolsHelper.get_image_size(
             image
@@ -176,12 +207,13 @@ class TestImageToolsHelper:
         assert ImageToolsHelper.convert_size(100) == "100.0 B"
         assert ImageToolsHelper.convert_size(10000) == "9.77 KB"
         assert ImageToolsHelper.convert_size(10000000) == "9.54 MB"
+        assert ImageToolsHelper.convert_size(1023) == "1023.0 B"
+        assert ImageToolsHelper.convert_size(1024) == "1.0 KB"
+        assert ImageToolsHelper.convert_size(1024 ** 5) == "1.0 PB"
 
     @staticmethod
     def test_get_string_file_size():
         """Test get_string_file_size method"""
         assert ImageToolsHelper.get_string_file_size(
-            os.path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado.jpg')
+            HelperTest.get_source_file('recien_llegado.jpg')
         ) == "77.52 KB"
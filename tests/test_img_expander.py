@@ -3,12 +3,10 @@ ImageExpander unittest class.
 
 Use pytest package.
 """
-import os.path as _path
+import cv2
 import pytest
-from .helper import HelperTest
 from imgtools_m8.model_conf import ScaleSelector
 from imgtools_m8.helper import ImageToolsHelper
-from imgtools_m8.img_tools import ImageTools
 from imgtools_m8.img_expander import ImageExpander
 from imgtools_m8.exceptions import ImgToolsException
 
@@ -19,52 +17,186 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
+PKG_MODELS = ImageToolsHelper.get_package_models_path()
 
-class TestImageExpander:
 
-    def setup_method(self):
-        """
-        Setup any state tied to the execution of the given function.
+@pytest.fixture(scope="module")
+def expander():
+    """ImageExpander shared by the module tests, so models are only loaded once."""
+    return ImageExpander()
+
 
-        Invoked for every test function in the module.
-        """
-        self.obj = ImageExpander()
+class TestImageExpander:
 
-    def test_set_model_conf(self):
-        """Test has_conf method"""
-        assert self.obj.set_model_conf({
-            'path': ImageToolsHelper.get_package_models_path(),
+    @staticmethod
+    @pytest.mark.parametrize("model_conf", [
+        {
+            'path': PKG_MODELS,
             'model_name': 'edsr',
             'scale': 2,
             'scale_selector': ScaleSelector.AUTO_SCALE
-        }) is True
-        assert self.obj.set_model_conf() is True
-        assert self.obj.set_model_conf({
-            'scale': 3
-        }) is True
-        assert self.obj.set_model_conf({
-            'path': ImageToolsHelper.get_package_models_path(),
+        },
+        None,
+        {'scale': 3},
+        {
+            'path': PKG_MODELS,
             'scale': 4
-        }) is True
+        },
+    ])
+    def test_set_model_conf(expander, model_conf):
+        """Test set_model_conf method"""
+        assert expander.set_model_conf(model_conf) is True
 
-    def test_many_image_upscale(self):
-        """Test many_image_upscale method"""
-        image = ImageTools.read_image(
-            source_path=_path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado_min.jpg'
-            )
+    @staticmethod
+    def test_is_cuda_enabled(monkeypatch):
+        """Test is_cuda_enabled method"""
+        monkeypatch.delenv('IMGTOOLS_M8_CUDA', raising=False)
+        assert ImageExpander.is_cuda_enabled() is False
+        monkeypatch.setenv('IMGTOOLS_M8_CUDA', '1')
+        assert ImageExpander.is_cuda_enabled() is (
+            cv2.cuda.getCudaEnabledDeviceCount() > 0
         )
-        resized = self.obj.many_image_upscale(
+
+    @staticmethod
+    def test_load_model(expander):
+        """Test load_model method"""
+        assert expander.set_model_conf({'scale': 2}) is True
+        assert expander.load_model() is True
+        sr = expander.sr
+        assert expander.set_model_conf({'scale': 3}) is True
+        assert expander.load_model() is True
+        assert expander.sr is not sr
+        # model already read
+        assert expander.set_model_conf({'scale': 2}) is True
+        assert expander.load_model() is True
+        assert expander.sr is sr
+
+    @staticmethod
+    @pytest.mark.slow
+    def test_many_image_upscale(expander, recien_llegado_min_reduced_image):
+        """Test many_image_upscale method"""
+        # half size input, the super resolution cost scales with the pixels count
+        image = recien_llegado_min_reduced_image
+        resized = expander.many_image_upscale(
             image=image,
             nb_upscale=1,
             scale=3
         )
-        assert ImageToolsHelper.get_image_size(image)  != ImageToolsHelper.get_image_size(resized)
+        assert ImageToolsHelper.get_image_size(image) != ImageToolsHelper.get_image_size(resized)
         with pytest.raises(ImgToolsException):
-            self.obj.many_image_upscale(
+            expander.many_image_upscale(
                 image=image,
                 nb_upscale=1,
                 scale=-3
             )
 
+    @staticmethod
+    def test_many_image_upscale_mock(expander, recien_llegado_min_image, monkeypatch):
+        """Test many_image_upscale method, with a resize in place of the super resolution model"""
+        monkeypatch.setattr(
+            ImageExpander,
+            'upscale_image',
+            lambda self, image: cv2.resize(image, None, fx=3, fy=3, interpolation=cv2.INTER_NEAREST)
+        )
+        height, width = ImageToolsHelper.get_image_size(recien_llegado_min_image)
+        resized = expander.many_image_upscale(
+            image=recien_llegado_min_image,
+            nb_upscale=2,
+            scale=3
+        )
+        assert ImageToolsHelper.get_image_size(resized) == (height * 9, width * 9)
+
+    @staticmethod
+    def test_tiled_upscale(expander, recien_llegado_image, monkeypatch):
+        """Test tiled_upscale method, with a resize in place of the super resolution model"""
+        class ResizeSr:
+            """Nearest neighbor upscale, each output pixel only depends on its source pixel."""
+            @staticmethod
+            def upsample(image):
+                return cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_NEAREST)
+
+        monkeypatch.setattr(expander, 'sr', ResizeSr())
+        image = recien_llegado_image
+        tiled = expander.tiled_upscale(image, tile=64, pad=4)
+        assert tiled.shape == (image.shape[0] * 2, image.shape[1] * 2, image.shape[2])
+        assert (tiled == ResizeSr.upsample(image)).all()
+
+    @staticmethod
+    def test_upscale_image_contiguous(expander, recien_llegado_image, monkeypatch):
+        """Test upscale_image method packs sliced images before the super resolution model"""
+        class ContiguousSr:
+            """Return the image the model receives."""
+            @staticmethod
+            def upsample(image):
+                assert image.flags['C_CONTIGUOUS']
+                return image
+
+        monkeypatch.setattr(expander, 'sr', ContiguousSr())
+        image = recien_llegado_image[::2, ::2]
+        assert not image.flags['C_CONTIGUOUS']
+        assert (expander.upscale_image(image) == image).all()
+        assert expander.upscale_image(None) is None
+
+    @staticmethod
+    @pytest.mark.parametrize("tile_size, tile_pad, tile_min_pixels, expected", [
+        (256, 32, 512 * 512, True),
+        (512, 0, None, True),
+        (0, 32, 512 * 512, False),
+        (256, -1, 512 * 512, False),
+        (256, 32, 'all', False),
+        (None, 32, 512 * 512, False),
+    ])
+    def test_set_tiling(tile_size, tile_pad, tile_min_pixels, expected):
+        """Test set_tiling method"""
+        expander = ImageExpander()
+        assert expander.set_tiling(tile_size, tile_pad, tile_min_pixels) is expected
+        if expected:
+            assert (expander.tile_size, expander.tile_pad, expander.tile_min_pixels) == (
+                tile_size, tile_pad, tile_min_pixels
+            )
+        else:
+            # tiling disabled by default
+            assert (expander.tile_size, expander.tile_pad, expander.tile_min_pixels) == (256, 32, None)
+
+    @staticmethod
+    def test_upscale_image_tiling(expander, recien_llegado_image, monkeypatch):
+        """Test upscale_image method tiles images over tile_min_pixels only"""
+        calls = []
+        monkeypatch.setattr(expander, 'sr', type('Sr', (), {'upsample': staticmethod(lambda image: image)})())
+        monkeypatch.setattr(
+            ImageExpander,
+            'tiled_upscale',
+            lambda self, image: calls.append(image.shape) or image
+        )
+        image = recien_llegado_image
+        h, w = image.shape[:2]
+        monkeypatch.setattr(expander, 'tile_min_pixels', h * w)
+        expander.upscale_image(image)
+        assert calls == []
+        monkeypatch.setattr(expander, 'tile_min_pixels', h * w - 1)
+        expander.upscale_image(image)
+        assert calls == [image.shape]
+        monkeypatch.setattr(expander, 'tile_min_pixels', None)
+        expander.upscale_image(image)
+        assert len(calls) == 1
+
+    @staticmethod
+    @pytest.mark.slow
+    def test_tiled_upscale_model(expander, mar_image, monkeypatch):
+        """Test upscale_image method by tiles stays close to a whole image upscale"""
+        assert expander.set_model_conf({'scale': 2}) is True
+        assert expander.load_model() is True
+        # small crop and tiles, over the tiling threshold, to keep the model cost low
+        image = mar_image[:96, :96]
+        # tiling disabled by default
+        assert expander.tile_min_pixels is None
+        full = expander.upscale_image(image)
+        monkeypatch.setattr(expander, 'tile_size', 48)
+        monkeypatch.setattr(expander, 'tile_pad', 32)
+        monkeypatch.setattr(expander, 'tile_min_pixels', 64 * 64)
+        tiled = expander.upscale_image(image)
+        assert tiled.shape == full.shape
+        # a few pixels near tile borders may differ slightly
+        diff = cv2.absdiff(tiled, full)
+        assert diff.max() <= 2
+        assert (diff > 0).mean() < 0.001
@@ -5,9 +5,16 @@ Use pytest package.
 """
 import pytest
 import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
 from .helper import HelperTest
 from imgtools_m8.process_conf import ProcessConf
 from imgtools_m8.img_tools import ImageTools
+from imgtools_m8.img_expander import ImageExpander
 from imgtools_m8.helper import ImageToolsHelper
 from imgtools_m8.model_scale_selector import ModelScaleSelector
 from imgtools_m8.exceptions import ImgToolsException
@@ -21,29 +28,54 @@ __status__ = "Production"
 __version__ = "1.0.0"
 
 
+def _resize_upscale(expander: ImageExpander, image):
+    """Upscale an image with a nearest neighbor resize, by the selected model scale."""
+    scale = expander.sr.getScale()
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+
+
+def _get_default_conf(output_path: str) -> dict:
+    """Get the ImageTools configuration each test starts from."""
+    return {
+        'source_path': HelperTest.get_source_path(),
+        'output_path': output_path,
+        'output_formats': [
+            {
+                'fixed_width': 35,
+                'fixed_height': 22,
+                'formats': [
+                    {'ext': '.jpg', 'quality': 80}
+                ]
+            }
+        ]
+    }
+
+
+@pytest.fixture(scope="class")
+def output_path(tmp_path_factory) -> str:
+    """Temporary output directory shared by the class tests."""
+    return str(tmp_path_factory.mktemp('output'))
+
+
+@pytest.fixture(scope="class")
+def sr_models() -> dict:
+    """Super resolution models loaded by the class tests, so each model file is only read once."""
+    return {}
+
+
 class TestImageTools:
 
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_tools(self, output_path, sr_models):
         """
         Setup any state tied to the execution of the given function.
 
-        Invoked for every test function in the module.
+        Invoked for every test function in the module,
+        the new instance only reuses the models already loaded by the class tests.
         """
-        output_formats = [
-                {
-                    'fixed_width': 35,
-                    'fixed_height': 22,
-                    'formats': [
-                        {'ext': '.jpg', 'quality': 80}
-                    ]
-                }
-            ]
-
-        self.obj = ImageTools(
-            source_path=HelperTest.get_source_path(),
-            output_path=HelperTest.get_output_path(),
-            output_formats=output_formats
-        )
+        self.obj = ImageTools(**_get_default_conf(output_path))
+        self.obj.init_expander()
+        self.obj.expander._sr_models = sr_models
 
     def test_has_conf(self):
         """Test has_conf method"""
@@ -103,14 +135,9 @@ class TestImageTools:
         assert self.obj.get_model_scale() == 2
         assert self.obj.is_auto_scale() is True
 
-    def test_upscale_with_auto_scale(self):
+    def test_upscale_with_auto_scale(self, recien_llegado_min_image):
         """Test upscale_with_auto_scale method"""
-        image = self.obj.read_image(
-            os.path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado_min.jpg'
-            )
-        )
+        image = recien_llegado_min_image
         size = ImageToolsHelper.get_image_size(image)
         upscale_stats = ModelScaleSelector.get_upscale_stats(
             size=size,
@@ -137,14 +164,9 @@ class TestImageTools:
         ) is False
 
 
-    def test_upscale_with_fixed_scale(self):
+    def test_upscale_with_fixed_scale(self, recien_llegado_min_image):
         """Test upscale_with_fixed_scale method"""
-        image = self.obj.read_image(
-            os.path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado_min.jpg'
-            )
-        )
+        image = recien_llegado_min_image
         size = ImageToolsHelper.get_image_size(image)
         output_formats = [
             {
@@ -187,15 +209,32 @@ class TestImageTools:
             file_name=os.path.basename(self.obj.conf.get_source_path())
         ) is True
 
+    @staticmethod
+    def test_upscale_without_upscale_needed(recien_llegado_min_image, tmp_path):
+        """Test upscale methods don't load the model if no upscale is needed"""
+        tools = ImageTools(**_get_default_conf(str(tmp_path)))
+        size = ImageToolsHelper.get_image_size(recien_llegado_min_image)
+        for upscale in (tools.upscale_with_auto_scale, tools.upscale_with_fixed_scale):
+            upscale_stats = ModelScaleSelector.get_upscale_stats(
+                size=size,
+                output_formats=tools.conf.get_output_formats(),
+                model_scale=tools.get_model_scale()
+            )
+            assert upscale(
+                image=recien_llegado_min_image,
+                upscale_stats=upscale_stats,
+                file_name='recien_llegado_min.jpg'
+            ) is True
+        assert tools.has_expander_model() is False
+
+    @pytest.mark.slow
     def test_run(self):
         """Test run method"""
         tst = self.obj.run()
         # unable to upscale bad_image.jpg
         assert tst is False
         self.obj.set_source_path(
-            source_path=os.path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado.jpg')
+            source_path=HelperTest.get_source_file('recien_llegado.jpg')
         )
         output_formats = [
             {
@@ -221,13 +260,159 @@ class TestImageTools:
         tst = self.obj.run()
         assert tst is True
 
+    def test_run_mock(self, monkeypatch):
+        """Test run method, with a resize in place of the super resolution model"""
+        monkeypatch.setattr(ImageExpander, 'upscale_image', _resize_upscale)
+        self.obj.set_source_path(
+            source_path=HelperTest.get_source_file('recien_llegado.jpg')
+        )
+        self.obj.set_output_formats([
+            {
+                'fixed_height': 381,
+                'formats': [
+                    {'ext': '.jpg'}
+                ]
+            },
+            {
+                'fixed_size': 200,
+                'formats': [
+                    {'ext': '.png', 'compression': 3}
+                ]
+            }
+        ])
+        assert self.obj.run() is True
+
+    @staticmethod
+    def test_run_write_executor(tmp_path, monkeypatch):
+        """Test run method writes the formats of a single image concurrently, then stops the threads"""
+        executors = []
+
+        def write_images_by_format(**kwargs):
+            executors.append(kwargs.get('executor'))
+            return write_by_format(**kwargs)
+
+        write_by_format = ImageTools.write_images_by_format
+        monkeypatch.setattr(ImageTools, 'write_images_by_format', write_images_by_format)
+        tools = ImageTools(
+            source_path=HelperTest.get_source_file('mar.jpg'),
+            output_path=str(tmp_path),
+            output_formats=[
+                {
+                    'fixed_width': 30,
+                    'formats': [
+                        {'ext': '.jpg', 'quality': 80},
+                        {'ext': '.png', 'compression': 3}
+                    ]
+                }
+            ]
+        )
+        assert tools.run() is True
+        assert len(executors) == 1 and isinstance(executors[0], ThreadPoolExecutor)
+        assert tools._write_executor is None
+        assert sorted(os.listdir(tmp_path)) == ['mar_30x43.jpg', 'mar_30x43.png']
+        # images of a directory are already processed concurrently, no upscale needed
+        executors.clear()
+        tools.set_source_path(HelperTest.get_source_path())
+        tools.run()
+        assert executors and set(executors) == {None}
+
+    def test_run_directory(self, tmp_path):
+        """Test run method on a source directory, images are processed in threads"""
+        self.obj.set_output_path(str(tmp_path))
+        # unable to read bad_image.jpg
+        assert self.obj.run() is False
+        assert sorted(os.listdir(tmp_path)) == [
+            'mar_15x22.jpg',
+            'recien_llegado_34x22.jpg',
+            'recien_llegado_min_35x21.jpg'
+        ]
+
+    @staticmethod
+    def test_run_directory_auto_scale(tmp_path, monkeypatch):
+        """Test run method upscales images of a directory concurrently with auto scale"""
+        class OwnedLock:
+            """Lock knowing the thread holding it."""
+            def __init__(self):
+                self.lock = threading.Lock()
+                self.owner = None
+
+            def __enter__(self):
+                self.lock.acquire()
+                self.owner = threading.get_ident()
+
+            def __exit__(self, *args):
+                self.owner = None
+                self.lock.release()
+
+        source_path, output_path = tmp_path / 'source', tmp_path / 'output'
+        source_path.mkdir()
+        output_path.mkdir()
+        for i in range(4):
+            shutil.copy(
+                HelperTest.get_source_file('recien_llegado_min.jpg'),
+                source_path / ('image_%s.jpg' % i)
+            )
+        tools = ImageTools(
+            source_path=str(source_path),
+            output_path=str(output_path),
+            output_formats=[
+                {'fixed_width': 120, 'formats': [{'ext': '.jpg'}]},
+                {'fixed_width': 160, 'formats': [{'ext': '.png'}]}
+            ]
+        )
+        assert tools.is_auto_scale() is True
+        model_scale = tools.get_model_scale()
+        lock = OwnedLock()
+        tools._expander_lock = lock
+        upscales, write_threads = [], set()
+
+        def upscale(expander, image):
+            upscales.append(threading.get_ident())
+            # let other threads run while the model is busy
+            time.sleep(0.05)
+            return _resize_upscale(expander, image)
+
+        def write_images_by_format(**kwargs):
+            # resizes and writes run outside the model lock
+            assert lock.owner != threading.get_ident()
+            write_threads.add(threading.get_ident())
+            return write_by_format(**kwargs)
+
+        write_by_format = ImageTools.write_images_by_format
+        monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+        monkeypatch.setattr(ImageExpander, 'upscale_image', upscale)
+        monkeypatch.setattr(ImageTools, 'write_images_by_format', write_images_by_format)
+        assert tools.run() is True
+        assert len(set(upscales)) > 1
+        assert len(write_threads) > 1
+        # the scales selected for each image leave the configured scale unchanged
+        assert tools.get_model_scale() == model_scale
+        assert sorted(os.listdir(output_path)) == sorted(
+            'image_%s_%s' % (i, name)
+            for i in range(4)
+            for name in ('120x75.jpg', '160x100.png')
+        )
+
+    def test_resize_image_if_needed(self, recien_llegado_image):
+        """Test resize_image_if_needed method"""
+        image = recien_llegado_image
+        output_format = {'fixed_width': 200}
+        resized = self.obj.resize_image_if_needed(image, output_format)
+        assert resized.shape[:2] == (127, 200)
+        assert self.obj.resize_image_if_needed(image, {'fixed_width': 400}) is image
+        # same target size resized only once
+        resized_cache = {}
+        resized = self.obj.resize_image_if_needed(image, output_format, resized_cache)
+        assert self.obj.resize_image_if_needed(
+            image, {'fixed_width': 200, 'formats': []}, resized_cache
+        ) is resized
+        assert list(resized_cache) == [(200, None)]
+
     def test_fixed_scale(self):
         """Test run method"""
         self.obj.set_fixed_scale(2)
         self.obj.set_source_path(
-            source_path=os.path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado_min.jpg')
+            source_path=HelperTest.get_source_file('recien_llegado_min.jpg')
         )
         output_formats = [
             {
@@ -247,9 +432,7 @@ class TestImageTools:
         # 50% jpg quality
 
         self.obj.set_source_path(
-            source_path=os.path.join(
-                HelperTest.get_source_path(),
-                'mar.jpg')
+            source_path=HelperTest.get_source_file('mar.jpg')
         )
         output_formats = [
             {
@@ -313,52 +496,86 @@ class TestImageTools:
             source_path=HelperTest.get_source_path()
         ) is True
         assert ProcessConf.is_source_path(
-            source_path=os.path.join(
-                HelperTest.get_source_path(),
-                'recien_llegado.jpg')
+            source_path=HelperTest.get_source_file('recien_llegado.jpg')
         ) is True
         assert ProcessConf.is_source_path(
-            source_path=os.path.join(
-                HelperTest.get_source_path(),
-                'bad_file')
+            source_path=HelperTest.get_source_file('bad_file')
         ) is False
         assert ProcessConf.is_source_path(
-            source_path=os.path.join(
-                HelperTest.get_source_path(),
-                'bad_dir')
+            source_path=HelperTest.get_source_file('bad_dir')
         ) is False
 
     @staticmethod
-    def test_write_images_by_format():
+    def test_write_images_by_format(mar_image, tmp_path):
         """Test write_images_by_format method"""
-        source_path = os.path.join(
-            HelperTest.get_source_path(),
-            'mar.jpg')
-        image = ImageTools.read_image(source_path)
         assert ImageTools.write_images_by_format(
-            image=image,
-            output_path=HelperTest.get_output_path(),
+            image=mar_image,
+            output_path=str(tmp_path),
             file_name="bad",
             output_formats=[
                 {'ext_bad': '.webp', 'quality_bad': 80}
             ]
         ) is False
+        assert ImageTools.write_images_by_format(
+            image=mar_image,
+            output_path=str(tmp_path),
+            file_name="mar.jpg",
+            output_formats=[
+                {'ext': '.webp', 'quality': 80},
+                {'ext': '.png', 'compression': 3},
+                {'ext': '.jpg', 'quality': 80}
+            ]
+        ) is True
+        assert sorted(os.listdir(tmp_path)) == ['mar_276x397.jpg', 'mar_276x397.png', 'mar_276x397.webp']
+        # formats written concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert ImageTools.write_images_by_format(
+                image=mar_image,
+                output_path=str(tmp_path),
+                file_name="mar_copy.jpg",
+                output_formats=[
+                    {'ext': '.png', 'compression': 3},
+                    {'ext': '.jpg', 'quality': 80}
+                ],
+                executor=executor
+            ) is True
+            assert ImageTools.write_images_by_format(
+                image=mar_image,
+                output_path=str(tmp_path),
+                file_name="mar.jpg",
+                output_formats=[
+                    {'ext': '.webp', 'quality': 80},
+                    {'ext_bad': '.webp', 'quality_bad': 80}
+                ],
+                executor=executor
+            ) is False
+        assert sorted(os.listdir(tmp_path)) == [
+            'mar_276x397.jpg', 'mar_276x397.png', 'mar_276x397.webp',
+            'mar_copy_276x397.jpg', 'mar_copy_276x397.png'
+        ]
+        assert ImageTools.write_images_by_format(
+            image=mar_image,
+            output_path=str(tmp_path),
+            file_name="mar.jpg",
+            output_formats=[
+                {'ext': '.webp', 'quality': 80},
+                {'ext_bad': '.webp', 'quality_bad': 80}
+            ]
+        ) is False
 
     @staticmethod
     def test_read_image():
         """Test read_image method"""
-        image = ImageTools.read_image(os.path.join(
-            HelperTest.get_source_path(),
-            'recien_llegado.jpg'))
+        image = ImageTools.read_image(HelperTest.get_source_file('recien_llegado.jpg'))
         assert image is not None
         assert image.shape[:2] == (216, 340)
 
     @staticmethod
     def test_get_image_size():
         """Test get_image_size method"""
-        image = ImageTools.read_image(os.path.join(
-            HelperTest.get_source_path(),
-            'recien_llegado.jpg'))
+        image = ImageTools.read_image(
+            HelperTest.get_source_file('recien_llegado.jpg')
+        )
         size = ImageToolsHelper.get_image_size(image)
         assert size == (216, 340)
 
@@ -366,6 +583,62 @@ class TestImageTools:
     def test_get_jpeg_write_options():
         """Test get_jpeg_write_options method"""
         assert ImageTools.get_jpeg_write_options({}) is None
+        assert ImageTools.get_jpeg_write_options({'quality': 80}) == [
+            cv2.IMWRITE_JPEG_QUALITY, 80,
+            cv2.IMWRITE_JPEG_PROGRESSIVE, 1,
+            cv2.IMWRITE_JPEG_OPTIMIZE, 1
+        ]
+        assert ImageTools.get_jpeg_write_options(
+            {'ext': '.jpg', 'progressive': 0}
+        ) == [
+            cv2.IMWRITE_JPEG_PROGRESSIVE, 0,
+            cv2.IMWRITE_JPEG_OPTIMIZE, 1
+        ]
+
+    @staticmethod
+    def test_run_same_format(mar_image, tmp_path):
+        """Test run method re-encodes a same format output like the decoded image"""
+        # an alpha channel is dropped by the decode, so it is not in the output
+        source_path = tmp_path / 'mar.png'
+        output_path = tmp_path / 'output'
+        output_path.mkdir()
+        assert cv2.imwrite(str(source_path), cv2.cvtColor(mar_image, cv2.COLOR_BGR2BGRA)) is True
+        tools = ImageTools(
+            source_path=str(source_path),
+            output_path=str(output_path),
+            output_formats=[
+                {
+                    'formats': [
+                        {'ext': '.png'}
+                    ]
+                }
+            ]
+        )
+        assert tools.run() is True
+        output = cv2.imread(str(output_path / 'mar_276x397.png'), cv2.IMREAD_UNCHANGED)
+        assert output.shape == mar_image.shape
+        assert (output == mar_image).all()
+
+    @staticmethod
+    def test_get_write_options():
+        """Test get_write_options method"""
+        assert ImageTools.get_write_options({'ext': '.png', 'compression': 3}) == (
+            '.png', [cv2.IMWRITE_PNG_COMPRESSION, 3]
+        )
+        # cached result
+        assert ImageTools.get_write_options(
+            {'ext': '.png', 'compression': 3}
+        ) is ImageTools.get_write_options({'ext': '.png', 'compression': 3})
+        assert ImageTools.get_write_options({'ext': '.webp'}) == ('.webp', None)
+        # JPEG default options kept for options not set
+        key = ProcessConf.get_write_formats_key([{'ext': '.jpg', 'quality': 80}])
+        assert ImageTools.get_write_options_by_key(key[0]) == ('.jpg', [
+            cv2.IMWRITE_JPEG_QUALITY, 80,
+            cv2.IMWRITE_JPEG_PROGRESSIVE, 1,
+            cv2.IMWRITE_JPEG_OPTIMIZE, 1
+        ])
+        assert ImageTools.get_write_options({'ext': '.png', 'compression': 10}) is None
+        assert ImageTools.get_write_options({'ext': '.pb'}) is None
 
     @staticmethod
     def test_get_webp_write_options():
@@ -378,11 +651,9 @@ class TestImageTools:
         assert ImageTools.get_png_write_options({}) is None
 
     @staticmethod
-    def test_image_resize():
+    def test_image_resize(recien_llegado_image):
         """Test image_resize method"""
-        image = ImageTools.read_image(os.path.join(
-            HelperTest.get_source_path(),
-            'recien_llegado.jpg'))
+        image = recien_llegado_image
         resized = ImageTools.image_resize(image, width=200)
         assert image.shape[:2] == (216, 340)
         assert resized.shape[:2] == (127, 200)
@@ -396,3 +667,16 @@ class TestImageTools:
                 width=0,
                 height=0
             )
+
+    @staticmethod
+    @pytest.mark.parametrize("shape, width, height, expected", [
+        # int(90 * (7 / float(10))) gives 62
+        ((10, 90, 3), None, 7, (7, 63)),
+        # int(90 * (7 / float(10))) gives 62
+        ((90, 10, 3), 7, None, (63, 7)),
+    ])
+    def test_image_resize_exact_ratio(shape, width, height, expected):
+        """Test image_resize method keeps the exact aspect ratio where float math loses a pixel"""
+        image = np.zeros(shape, dtype=np.uint8)
+        resized = ImageTools.image_resize(image, width=width, height=height)
+        assert resized.shape[:2] == expected
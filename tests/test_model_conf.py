@@ -3,6 +3,8 @@ ModelConf unittest class.
 
 Use pytest package.
 """
+import os
+import pytest
 from ve_utils.utils import UType as Ut
 from imgtools_m8.model_conf import ModelConf, ScaleSelector
 from imgtools_m8.helper import ImageToolsHelper
@@ -14,74 +16,80 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
+PKG_MODELS = ImageToolsHelper.get_package_models_path()
 
-class TestModelConf:
 
-    def setup_method(self):
-        """
-        Setup any state tied to the execution of the given function.
+@pytest.fixture
+def model_conf() -> ModelConf:
+    """New ModelConf for the tests that change it, the static tests need no setup."""
+    return ModelConf(
+        model_path=PKG_MODELS,
+        model_name='edsr',
+        scale=2
+    )
 
-        Invoked for every test function in the module.
-        """
-        self.obj = ModelConf(
-            model_path=ImageToolsHelper.get_package_models_path(),
-            model_name='edsr',
-            scale=2
-        )
 
-    def test_is_ready(self):
+class TestModelConf:
+
+    @staticmethod
+    def test_is_ready(model_conf):
         """Test is_ready method"""
-        assert self.obj.is_ready() is True
+        assert model_conf.is_ready() is True
 
-    def test_set_model_path(self):
+    @staticmethod
+    def test_set_model_path(model_conf):
         """Test set_model_path method"""
-        self.obj.model_path = None
-        assert self.obj.has_model_path() is False
-        assert self.obj.set_model_path(
-            ImageToolsHelper.get_package_models_path()
+        model_conf.model_path = None
+        assert model_conf.has_model_path() is False
+        assert model_conf.set_model_path(
+            PKG_MODELS
         ) is True
-        assert self.obj.get_path() == ImageToolsHelper.get_package_models_path()
-        assert self.obj.has_model_path() is True
-        assert self.obj.set_model_path('/bad_path') is False
-        assert self.obj.has_model_path() is False
+        assert model_conf.get_path() == PKG_MODELS
+        assert model_conf.has_model_path() is True
+        assert model_conf.set_model_path('/bad_path') is False
+        assert model_conf.has_model_path() is False
 
-    def test_set_model_name(self):
+    @staticmethod
+    def test_set_model_name(model_conf):
         """Test set_model_name method"""
-        self.obj.model_name = None
-        assert self.obj.has_model_name() is False
-        assert self.obj.set_model_name('edsr') is True
-        assert self.obj.get_model_name() == 'edsr'
-        assert self.obj.has_model_name() is True
-        assert self.obj.set_model_name('bad_model') is False
-        assert self.obj.has_model_name() is False
-
-    def test_set_scale(self):
+        model_conf.model_name = None
+        assert model_conf.has_model_name() is False
+        assert model_conf.set_model_name('edsr') is True
+        assert model_conf.get_model_name() == 'edsr'
+        assert model_conf.has_model_name() is True
+        assert model_conf.set_model_name('bad_model') is False
+        assert model_conf.has_model_name() is False
+
+    @staticmethod
+    def test_set_scale(model_conf):
         """Test set_scale method"""
-        self.obj.scale = None
-        assert self.obj.has_scale() is False
-        assert self.obj.set_scale(value=2) is True
-        assert self.obj.has_scale() is True
-        assert self.obj.set_scale(value=0, set_default=False) is False
-        assert self.obj.has_scale() is False
-        assert self.obj.set_scale(0, set_default=True) is True
-        assert self.obj.has_scale() is True
-        assert self.obj.get_scale() == 2
-        assert self.obj.get_file_name() == "EDSR_x2.pb"
-
-    def test_set_scale_selector(self):
+        model_conf.scale = None
+        assert model_conf.has_scale() is False
+        assert model_conf.set_scale(value=2) is True
+        assert model_conf.has_scale() is True
+        assert model_conf.set_scale(value=0, set_default=False) is False
+        assert model_conf.has_scale() is False
+        assert model_conf.set_scale(0, set_default=True) is True
+        assert model_conf.has_scale() is True
+        assert model_conf.get_scale() == 2
+        assert model_conf.get_file_name() == "EDSR_x2.pb"
+
+    @staticmethod
+    def test_set_scale_selector(model_conf):
         """Test set_scale_selector method"""
-        assert self.obj.has_scale_selector() is True
-        self.obj.scale_selector = None
-        assert self.obj.has_scale_selector() is False
-        assert self.obj.set_scale_selector(
+        assert model_conf.has_scale_selector() is True
+        model_conf.scale_selector = None
+        assert model_conf.has_scale_selector() is False
+        assert model_conf.set_scale_selector(
             value=ScaleSelector.AUTO_SCALE
         ) is True
-        assert self.obj.has_scale_selector() is True
-        assert self.obj.get_scale_selector() == ScaleSelector.AUTO_SCALE
+        assert model_conf.has_scale_selector() is True
+        assert model_conf.get_scale_selector() == ScaleSelector.AUTO_SCALE
 
-    def test_get_available_scales(self):
+    @staticmethod
+    def test_get_available_scales(model_conf):
         """Test set_scale_selector method"""
-        assert self.obj.get_available_scales() == [2, 3, 4]
+        assert model_conf.get_available_scales() == [2, 3, 4]
 
     @staticmethod
     def test_get_valid_model_names():
@@ -101,7 +109,7 @@ class TestModelConf:
     def test_is_model_path():
         """Test is_model_path method"""
         assert ModelConf.is_model_path(
-            value=ImageToolsHelper.get_package_models_path()
+            value=PKG_MODELS
         ) is True
         assert ModelConf.is_model_path('/bad/path') is False
 
@@ -109,14 +117,36 @@ class TestModelConf:
     def test_get_models_list():
         """Test get_models_list method"""
         assert len(ModelConf.get_models_list(
-            path=ImageToolsHelper.get_package_models_path()
+            path=PKG_MODELS
         )) == 3
+        # cached list, returned as a new list the caller can change
+        models = ModelConf.get_models_list(path=PKG_MODELS)
+        models.append('bad.pb')
+        assert len(ModelConf.get_models_list(
+            path=PKG_MODELS
+        )) == 3
+        assert ModelConf.get_models_list(path='/bad/path') is None
+
+    @staticmethod
+    def test_list_models(tmp_path):
+        """Test list_models method"""
+        (tmp_path / 'edsr_x3.pb').touch()
+        (tmp_path / 'edsr_x2.pb').touch()
+        os.utime(tmp_path, ns=(1, 1))
+        result = ModelConf.list_models(str(tmp_path), 1)
+        assert result == ('edsr_x2.pb', 'edsr_x3.pb')
+        # cached result
+        assert ModelConf.list_models(str(tmp_path), 1) is result
+        # a new directory mtime lists the directory again
+        (tmp_path / 'edsr_x4.pb').touch()
+        os.utime(tmp_path, ns=(2, 2))
+        assert ModelConf.get_models_list(str(tmp_path)) == ['edsr_x2.pb', 'edsr_x3.pb', 'edsr_x4.pb']
 
     @staticmethod
     def test_get_model_scale():
         """Test get_model_scale method"""
         models = ModelConf.get_models_list(
-            path=ImageToolsHelper.get_package_models_path()
+            path=PKG_MODELS
         )
         assert ModelConf.get_model_scale(
             file_name=models[0]
@@ -126,7 +156,7 @@ class TestModelConf:
     def test_get_model_scales_available():
         """Test get_model_scales_available method"""
         scale_list = ModelConf.get_model_scales_available(
-            path=ImageToolsHelper.get_package_models_path(),
+            path=PKG_MODELS,
             model_name='edsr'
         )
         assert Ut.is_list(scale_list, not_null=True) is True
@@ -145,13 +175,13 @@ class TestModelConf:
     def test_get_model_file_name():
         """Test get_model_file_name method"""
         file_name = ModelConf.get_model_file_name(
-            path=ImageToolsHelper.get_package_models_path(),
+            path=PKG_MODELS,
             model_name='edsr',
             scale=2
         )
         assert file_name == "EDSR_x2.pb"
         assert ModelConf.is_model_file_name(
-            model_path=ImageToolsHelper.get_package_models_path(),
+            model_path=PKG_MODELS,
             file_name=file_name
         ) is True
         file_name = ModelConf.get_model_file_name(
@@ -161,7 +191,7 @@ class TestModelConf:
         )
         assert file_name is None
         assert ModelConf.is_model_file_name(
-            model_path=ImageToolsHelper.get_package_models_path(),
+            model_path=PKG_MODELS,
             file_name=file_name
         ) is False
 
@@ -169,13 +199,13 @@ class TestModelConf:
     def test_is_scale():
         """Test is_scale method"""
         is_scale = ModelConf.is_scale(
-            model_path=ImageToolsHelper.get_package_models_path(),
+            model_path=PKG_MODELS,
             model_name='edsr',
             scale=2
         )
         assert is_scale is True
         is_scale = ModelConf.is_scale(
-            model_path=ImageToolsHelper.get_package_models_path(),
+            model_path=PKG_MODELS,
             model_name='edsr',
             scale=12
         )
@@ -15,146 +15,146 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
+NEED_UPSCALE_CASES = [
+    ({'width': 22, 'height': 23, 'fixed_width': 25}, True),
+    ({'width': 22, 'height': 23, 'fixed_height': 25}, True),
+    ({'width': 22, 'height': 23, 'fixed_width': 25, 'fixed_height': 25}, True),
+    ({'width': 22, 'height': 23}, False),
+    ({'width': 22, 'height': 23, 'fixed_width': 18}, False),
+    ({'width': 22, 'height': 23, 'fixed_height': 18}, False),
+    ({'width': 22, 'height': 23, 'fixed_width': 15, 'fixed_height': 18}, False),
+]
+
+NEED_UPSCALE_ERRORS = [
+    {'width': 0, 'height': 23},
+    {'width': 22, 'height': 0},
+    {'width': -1, 'height': 23},
+    {'width': 22, 'height': -1}
+]
+
+MODEL_SCALE_NEEDED_CASES = [
+    ({'height': 200, 'width': 400, 'fixed_width': 1900}, 5),
+    ({'height': 200, 'width': 500, 'fixed_width': 1600, 'fixed_height': 1600}, 4),
+    ({'height': 200, 'width': 300, 'fixed_width': 1200, 'fixed_height': 800}, 4),
+    ({'height': 200, 'width': 300, 'fixed_width': 200, 'fixed_height': 350}, 2),
+    ({'height': 200, 'width': 500, 'fixed_height': 600}, 3),
+    ({'height': 200, 'width': 400, 'fixed_width': 200}, 0),
+]
+
+MODEL_SCALE_NEEDED_ERRORS = [
+    {'width': 0, 'height': 22},
+    {'width': 22, 'height': 0},
+]
+
+COUNT_UPSCALE_CASES = [
+    ({'height': 200, 'width': 400, 'model_scale': 3, 'fixed_width': 1900}, 2),
+    ({'height': 200, 'width': 500, 'model_scale': 2, 'fixed_height': 1600}, 3),
+    ({'height': 200, 'width': 300, 'model_scale': 4, 'fixed_width': 1200, 'fixed_height': 800}, 1),
+    ({'height': 200, 'width': 300, 'model_scale': 2, 'fixed_width': 200, 'fixed_height': 350}, 1),
+    ({'height': 200, 'width': 500, 'model_scale': 2, 'fixed_height': 600}, 2),
+    ({'height': 200, 'width': 400, 'model_scale': 2, 'fixed_width': 200}, 0),
+]
+
+COUNT_UPSCALE_ERRORS = [
+    {'width': 0, 'height': 22, 'model_scale': 2},
+    {'width': 22, 'height': 0, 'model_scale': 2},
+    {'width': 22, 'height': 22, 'model_scale': 0},
+]
+
+BEST_SCALE_COMBINATION_CASES = [
+    (-1, [2, 3, 4], None),
+    (0, [2, 3, 4], None),
+    (2, [], None),
+    (1, [2, 3, 4], []),
+    (2, [2, 3, 4], [[2]]),
+    (3, [2, 3, 4], [[3]]),
+    (4, [2, 3, 4], [[4]]),
+    (5, [2, 3, 4], [[3, 2], [2, 3]]),
+    (7, [2, 3, 4], [[4, 3], [3, 4]]),
+    (8, [2, 3, 4], [[4, 4]]),
+    (9, [2, 3, 4], [[4, 3, 2], [3, 4, 2], [4, 2, 3], [3, 3, 3], [2, 4, 3], [3, 2, 4], [2, 3, 4]]),
+    (10, [2, 3, 4], [[4, 4, 2], [4, 3, 3], [3, 4, 3], [4, 2, 4], [3, 3, 4], [2, 4, 4]]),
+    (11, [2, 3, 4], [[4, 4, 3], [4, 3, 4], [3, 4, 4]]),
+    (13, [2, 3, 4], [
+        [4, 4, 3, 2], [4, 3, 4, 2], [3, 4, 4, 2], [4, 4, 2, 3],
+        [4, 3, 3, 3], [3, 4, 3, 3], [4, 2, 4, 3], [3, 3, 4, 3],
+        [2, 4, 4, 3], [4, 3, 2, 4], [3, 4, 2, 4], [4, 2, 3, 4],
+        [3, 3, 3, 4], [2, 4, 3, 4], [3, 2, 4, 4], [2, 3, 4, 4]
+    ]),
+    (15, [2, 3, 4], [[4, 4, 4, 3], [4, 4, 3, 4], [4, 3, 4, 4], [3, 4, 4, 4]]),
+    (19, [2, 3, 4], [[4, 4, 4, 4, 3], [4, 4, 4, 3, 4], [4, 4, 3, 4, 4], [4, 3, 4, 4, 4], [3, 4, 4, 4, 4]]),
+]
+
 
 class TestModelScaleSelector:
 
     @staticmethod
-    def test_need_upscale():
+    @pytest.mark.parametrize("params, expected", NEED_UPSCALE_CASES)
+    def test_need_upscale(params, expected):
         """Test need_upscale method"""
-        args = [
-            {'width': 22, 'height': 23, 'fixed_width': 25},
-            {'width': 22, 'height': 23, 'fixed_height': 25},
-            {'width': 22, 'height': 23, 'fixed_width': 25, 'fixed_height': 25},
-        ]
-        for params in args:
-            test = ModelScaleSelector.need_upscale(**params)
-            assert test is True
+        assert ModelScaleSelector.need_upscale(**params) is expected
 
-        args = [
-            {'width': 22, 'height': 23},
-            {'width': 22, 'height': 23, 'fixed_width': 18},
-            {'width': 22, 'height': 23, 'fixed_height': 18},
-            {'width': 22, 'height': 23, 'fixed_width': 15, 'fixed_height': 18},
-        ]
-        for params in args:
-            test = ModelScaleSelector.need_upscale(**params)
-            assert test is False
-
-        args = [
-            {'width': 0, 'height': 23},
-            {'width': 22, 'height': 0},
-            {'width': -1, 'height': 23},
-            {'width': 22, 'height': -1}
-        ]
-        for params in args:
-            with pytest.raises(ImgToolsException):
-                ModelScaleSelector.need_upscale(**params)
+    @staticmethod
+    @pytest.mark.parametrize("params", NEED_UPSCALE_ERRORS)
+    def test_need_upscale_errors(params):
+        """Test need_upscale method errors"""
+        with pytest.raises(ImgToolsException):
+            ModelScaleSelector.need_upscale(**params)
 
     @staticmethod
-    def test_get_model_scale_needed():
+    @pytest.mark.parametrize("params, expected", MODEL_SCALE_NEEDED_CASES)
+    def test_get_model_scale_needed(params, expected):
         """Test get_model_scale_needed method"""
-        args = [
-            {'height': 200, 'width': 400, 'fixed_width': 1900},
-            {'height': 200, 'width': 500, 'fixed_width': 1600, 'fixed_height': 1600},
-            {'height': 200, 'width': 300, 'fixed_width': 1200, 'fixed_height': 800},
-            {'height': 200, 'width': 300, 'fixed_width': 200, 'fixed_height': 350},
-            {'height': 200, 'width': 500, 'fixed_height': 600},
-            {'height': 200, 'width': 400, 'fixed_width': 200}
-        ]
-        results = []
-        for params in args:
-            tmp = ModelScaleSelector.get_model_scale_needed(**params)
-            results.append(tmp)
-        assert results == [5, 4, 4, 2, 3, 0]
-        with pytest.raises(ImgToolsException):
-            ModelScaleSelector.get_model_scale_needed(
-                width=0,
-                height=22
-            )
+        assert ModelScaleSelector.get_model_scale_needed(**params) == expected
 
+    @staticmethod
+    @pytest.mark.parametrize("params", MODEL_SCALE_NEEDED_ERRORS)
+    def test_get_model_scale_needed_errors(params):
+        """Test get_model_scale_needed method errors"""
         with pytest.raises(ImgToolsException):
-            ModelScaleSelector.get_model_scale_needed(
-                width=22,
-                height=0
-            )
+            ModelScaleSelector.get_model_scale_needed(**params)
 
     @staticmethod
-    def test_count_upscale():
+    @pytest.mark.parametrize("params, expected", COUNT_UPSCALE_CASES)
+    def test_count_upscale(params, expected):
         """Test count_upscale method"""
-        upscale_formats = [
-            {'height': 200, 'width': 400, 'model_scale': 3, 'fixed_width': 1900},
-            {'height': 200, 'width': 500, 'model_scale': 2, 'fixed_height': 1600},
-            {'height': 200, 'width': 300, 'model_scale': 4, 'fixed_width': 1200, 'fixed_height': 800},
-            {'height': 200, 'width': 300, 'model_scale': 2, 'fixed_width': 200, 'fixed_height': 350},
-            {'height': 200, 'width': 500, 'model_scale': 2, 'fixed_height': 600},
-            {'height': 200, 'width': 400, 'model_scale': 2, 'fixed_width': 200}
-        ]
-        results = []
-        for params in upscale_formats:
-            tmp = ModelScaleSelector.count_upscale(**params)
-            results.append(tmp)
-        assert results == [2, 3, 1, 1, 2, 0]
-        with pytest.raises(ImgToolsException):
-            ModelScaleSelector.count_upscale(
-                width=0,
-                height=22,
-                model_scale=2
-            )
-
-        with pytest.raises(ImgToolsException):
-            ModelScaleSelector.count_upscale(
-                width=22,
-                height=0,
-                model_scale=2
-            )
+        assert ModelScaleSelector.count_upscale(**params) == expected
 
+    @staticmethod
+    @pytest.mark.parametrize("params", COUNT_UPSCALE_ERRORS)
+    def test_count_upscale_errors(params):
+        """Test count_upscale method errors"""
         with pytest.raises(ImgToolsException):
-            ModelScaleSelector.count_upscale(
-                width=22,
-                height=22,
-                model_scale=0
-            )
+            ModelScaleSelector.count_upscale(**params)
 
     @staticmethod
-    def test_get_best_scale_combination():
+    @pytest.mark.parametrize("max_x_scale, available_scales, expected", BEST_SCALE_COMBINATION_CASES)
+    def test_get_best_scale_combination(max_x_scale, available_scales, expected):
         """Test get_best_scale_combinations method"""
-        upscale_formats = [
-            {'max_x_scale': -1, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 0, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 2, 'available_scales': []},
-            {'max_x_scale': 1, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 2, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 3, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 4, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 5, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 7, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 8, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 9, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 10, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 11, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 13, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 15, 'available_scales': [2, 3, 4]},
-            {'max_x_scale': 19, 'available_scales': [2, 3, 4]},
-        ]
-        results = []
-        for params in upscale_formats:
-            tmp = ModelScaleSelector.get_best_scale_combinations(**params)
-            results.append(tmp)
-        assert results == [
-            None, None, None, [],
-            [[2]], [[3]], [[4]],
-            [[3, 2], [2, 3]], [[4, 3], [3, 4]],
-            [[4, 4]], [[4, 3, 2], [3, 4, 2], [4, 2, 3], [3, 3, 3], [2, 4, 3], [3, 2, 4], [2, 3, 4]],
-            [[4, 4, 2], [4, 3, 3], [3, 4, 3], [4, 2, 4], [3, 3, 4], [2, 4, 4]],
-            [[4, 4, 3], [4, 3, 4], [3, 4, 4]],
-            [
-                [4, 4, 3, 2], [4, 3, 4, 2], [3, 4, 4, 2], [4, 4, 2, 3],
-                [4, 3, 3, 3], [3, 4, 3, 3], [4, 2, 4, 3], [3, 3, 4, 3],
-                [2, 4, 4, 3], [4, 3, 2, 4], [3, 4, 2, 4], [4, 2, 3, 4],
-                [3, 3, 3, 4], [2, 4, 3, 4], [3, 2, 4, 4], [2, 3, 4, 4]
-            ],
-            [[4, 4, 4, 3], [4, 4, 3, 4], [4, 3, 4, 4], [3, 4, 4, 4]],
-            [[4, 4, 4, 4, 3], [4, 4, 4, 3, 4], [4, 4, 3, 4, 4], [4, 3, 4, 4, 4], [3, 4, 4, 4, 4]]]
+        assert ModelScaleSelector.get_best_scale_combinations(
+            max_x_scale=max_x_scale,
+            available_scales=available_scales
+        ) == expected
+
+    @staticmethod
+    def test_get_best_scale_combination_cache():
+        """Test get_best_scale_combinations cached results"""
+        # cached result, returned as new lists the caller can change
+        tmp = ModelScaleSelector.get_best_scale_combinations(max_x_scale=7, available_scales=[2, 3, 4])
+        tmp[0].append(1)
+        assert ModelScaleSelector.get_best_scale_combinations(
+            max_x_scale=7,
+            available_scales=[2, 3, 4]
+        ) == [[4, 3], [3, 4]]
+
+    @staticmethod
+    def test_find_scale_combinations():
+        """Test find_scale_combinations method"""
+        result = ModelScaleSelector.find_scale_combinations(7, (2, 3, 4))
+        assert result == ((4, 3), (3, 4))
+        # cached result
+        assert ModelScaleSelector.find_scale_combinations(7, (2, 3, 4)) is result
+        assert ModelScaleSelector.find_scale_combinations(1, (2, 3, 4)) == ()
 
     @staticmethod
     def test_set_scale_stats():
@@ -381,6 +381,9 @@ class TestModelScaleSelector:
         )
         assert stats.get('max_upscale') == 3
         assert len(stats.get('stats')) == len(output_formats)
+        x_scales = [stat.get('x_scale') for stat in stats.get('stats')]
+        assert x_scales == sorted(x_scales)
+        assert stats.get('max_x_scale') == x_scales[-1]
         output_formats = [
             {'fixed_width': 350},
             {'fixed_width': 200},
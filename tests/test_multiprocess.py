@@ -1,11 +1,13 @@
 """
-ImageTools unittest class.
+MultiProcessImage unittest class.
 
 Use pytest package.
 """
-from os import path
+import gc
+import multiprocessing
+import pytest
 from .helper import HelperTest
-from imgtools_m8.multiprocess import MultiProcessImage
+from imgtools_m8.multiprocess import MultiProcessImage, _get_mp_context
 
 __author__ = "Eli Serra"
 __copyright__ = "Copyright 2020, Eli Serra"
@@ -15,14 +17,17 @@ __status__ = "Production"
 __version__ = "1.0.0"
 
 
-class TestImageTools:
+class TestMultiProcessImage:
 
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def setup_obj(self, tmp_path):
         """
         Setup any state tied to the execution of the given function.
 
-        Invoked for every test function in the module.
+        Invoked for every test function in the module,
+        images are written in a temporary output directory.
         """
+        self.output_path = str(tmp_path)
         output_formats = [
             {
                 'fixed_width': 35,
@@ -34,23 +39,98 @@ class TestImageTools:
         ]
         self.obj = MultiProcessImage(
             source_path=HelperTest.get_source_path(),
-            output_path=HelperTest.get_output_path(),
+            output_path=self.output_path,
             output_formats=output_formats
         )
+        yield
+        self.obj.close()
 
     def test_run_multiple(self):
         """Test run_multiple method"""
         tst = self.obj.run_multiple()
         # unable to upscale bad_image.jpg
         assert tst is False
+        # workers pool kept for the next runs
+        executor = self.obj.get_executor()
+        assert self.obj.run_multiple() is False
+        assert self.obj.get_executor() is executor
+        self.obj.set_output_formats([{'formats': [{'ext': '.png'}]}])
+        assert self.obj.get_executor() is not executor
 
         self.obj.set_source_path(
-            source_path=path.join(
-                HelperTest.get_source_path(),
-                'good'
-            )
+            source_path=HelperTest.get_source_file('good')
         )
 
         tst = self.obj.run_multiple()
-        # unable to upscale bad_image.jpg
         assert tst is True
+
+        # single image, processed without worker pool
+        self.obj.set_source_path(
+            source_path=HelperTest.get_source_file('mar.jpg')
+        )
+        assert self.obj.run_multiple() is True
+
+    def test_close(self):
+        """Test close method"""
+        executor = self.obj.get_executor()
+        finalizer = self.obj._finalizer
+        self.obj.close()
+        assert finalizer.alive is False
+        assert self.obj.get_executor() is not executor
+        self.obj.close()
+        self.obj.close()
+
+    @staticmethod
+    def test_executor_finalizer(tmp_path):
+        """Test the worker pool is stopped if the instance is dropped without close()"""
+        obj = MultiProcessImage(
+            source_path=HelperTest.get_source_path(),
+            output_path=str(tmp_path),
+            output_formats=[{'formats': [{'ext': '.png'}]}]
+        )
+        executor = obj.get_executor()
+        assert executor.submit(int).result() == 0
+        finalizer = obj._finalizer
+        del obj
+        gc.collect()
+        assert finalizer.alive is False
+        with pytest.raises(RuntimeError):
+            executor.submit(int)
+
+    @staticmethod
+    def test_get_mp_context(monkeypatch):
+        """Test _get_mp_context function"""
+        monkeypatch.delenv('IMGTOOLS_M8_FORKSERVER', raising=False)
+        assert _get_mp_context().get_start_method() == multiprocessing.get_start_method()
+        monkeypatch.setenv('IMGTOOLS_M8_FORKSERVER', '1')
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            assert _get_mp_context().get_start_method() == 'forkserver'
+
+    def test_get_executor_conf(self):
+        """Test get_executor kept while only the source path and auto scale state change"""
+        executor = self.obj.get_executor()
+        # inline single image runs create the default expander
+        self.obj.init_expander()
+        assert self.obj.get_executor() is executor
+        # auto scale state changed at run time
+        self.obj.expander.model_conf.set_scale(3)
+        self.obj.set_source_path(HelperTest.get_source_file('good'))
+        assert self.obj.get_executor() is executor
+        self.obj.set_fixed_scale(3)
+        executor = self.obj.get_executor()
+        assert self.obj.get_executor_conf(self.obj.get_worker_conf())['model_conf'][3] == 3
+        self.obj.set_fixed_scale(4)
+        assert self.obj.get_executor() is not executor
+
+    def test_get_worker_conf(self):
+        """Test get_worker_conf method"""
+        conf = self.obj.get_worker_conf()
+        assert conf.get('source_path') == HelperTest.get_source_path()
+        assert conf.get('output_path') == self.output_path
+        assert conf.get('output_formats') == self.obj.conf.get_output_formats()
+        assert conf.get('model_conf') is None
+
+        self.obj.init_expander()
+        conf = self.obj.get_worker_conf()
+        assert conf.get('model_conf').get('model_name') == 'edsr'
+        assert conf.get('model_conf').get('scale') == 2
@@ -1,13 +1,13 @@
 """
-ModelConf unittest class.
+ProcessConf unittest class.
 
 Use pytest package.
 """
+import copy
+import pickle
 import pytest
-from ve_utils.utils import UType as Ut
 from .helper import HelperTest
 from imgtools_m8.process_conf import ProcessConf
-from imgtools_m8.helper import ImageToolsHelper
 from imgtools_m8.exceptions import SettingInvalidException
 
 __author__ = "Eli Serra"
@@ -17,16 +17,158 @@ __license__ = "Apache Software License"
 __status__ = "Production"
 __version__ = "1.0.0"
 
-
-class TestModelConf:
-
-    def setup_method(self):
-        """
-        Setup any state tied to the execution of the given function.
-
-        Invoked for every test function in the module.
-        """
-        output_formats = [
+OUTPUT_FORMATS_VALID = [
+    {'formats': [{'ext': '.jpg', 'quality': 80, 'progressive': 1, 'optimize': 1}]},
+    {'fixed_width': 260, 'formats': [{'ext': '.webp', 'quality': 80}]},
+    {'fixed_height': 260, 'formats': [{'ext': '.png', 'compression': 0}]},
+    {'fixed_size': 260, 'formats': [{'ext': '.png', 'compression': 0}]},
+    {'fixed_scale': 6, 'formats': [{'ext': '.png', 'compression': 0}]},
+]
+
+WRITE_FORMATS_VALID = [
+    {'ext': '.png'},
+    {'ext': '.pNg', 'compression': 0},
+    {'ext': '.wEbP'},
+    {'ext': '.wEbP', 'quality': 50},
+    {'ext': '.jPeg'},
+    {'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 1},
+]
+
+WRITE_FORMATS_ERRORS = [
+    {'nop': '.webp'},
+    {'ext': 'png'},
+    {'ext': '.tar'},
+    {'ext': '.pdf'},
+    {'ext': '.png', 'compression': 10},
+    {'ext': '.webp', 'quality': 101},
+    {'ext': '.jpeg', 'quality': 101},
+]
+
+FIXED_WIDTH_OR_HEIGHT_CASES = [
+    ({'fixed_width': 260, 'fixed_height': 200}, True),
+    ({'fixed_height': 200}, True),
+    ({'fixed_width': 200}, True),
+    ({}, False),
+]
+
+FIXED_WIDTH_OR_HEIGHT_ERRORS = [
+    {'fixed_width': 0, 'fixed_height': 260},
+    {'fixed_width': 260, 'fixed_height': 0},
+    {'fixed_width': 260, 'fixed_size': 260},
+    {'fixed_width': 260, 'fixed_scale': 2},
+    {'fixed_height': 260, 'fixed_size': 260},
+    {'fixed_height': 260, 'fixed_scale': 2},
+    {'fixed_width': -1},
+    {'fixed_height': -1},
+]
+
+FIXED_SIZE_CASES = [
+    ({'fixed_size': 260}, True),
+    ({'fixed_size': 1}, True),
+    ({}, False),
+]
+
+FIXED_SIZE_ERRORS = [
+    {'fixed_scale': 2, 'fixed_size': 260},
+    {'fixed_width': 260, 'fixed_size': 260},
+    {'fixed_height': 260, 'fixed_size': 260},
+    {'fixed_size': 0},
+    {'fixed_size': -1},
+]
+
+FIXED_SCALE_CASES = [
+    ({'fixed_scale': 2}, True),
+    ({'fixed_scale': 10}, True),
+    ({}, False),
+]
+
+FIXED_SCALE_ERRORS = [
+    {'fixed_scale': 2, 'fixed_size': 260},
+    {'fixed_width': 260, 'fixed_scale': 260},
+    {'fixed_height': 260, 'fixed_scale': 260},
+    {'fixed_scale': 0},
+    {'fixed_scale': -1},
+]
+
+OUTPUT_SIZE_CASES = [
+    ({}, {}),
+    ({'fixed_height': 260, 'fixed_width': 10}, {'fixed_height': 260, 'fixed_width': 10}),
+    ({'fixed_height': 260, 'fixed_width': None}, {'fixed_height': 260, 'fixed_width': None}),
+    ({'fixed_height': None, 'fixed_width': 10}, {'fixed_height': None, 'fixed_width': 10}),
+    ({'fixed_scale': 2}, {'fixed_scale': 2}),
+    ({'fixed_size': 260}, {'fixed_height': 260, 'fixed_width': 260}),
+]
+
+OUTPUT_SIZE_ERRORS = [
+    {'fixed_width': 0},
+    {'fixed_width': 260, 'fixed_size': 260},
+    {'fixed_height': 260, 'fixed_scale': 2},
+    {'fixed_size': 0},
+    {'fixed_size': 260, 'fixed_scale': 2},
+    {'fixed_scale': 1},
+]
+
+JPG_FORMAT_CASES = [
+    ({'ext': '.jpg'}, True),
+    ({'ext': '.jpeg', 'quality': 100}, True),
+    ({'ext': '.jPg', 'quality': 50, 'progressive': 0}, True),
+    ({'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 1}, True),
+    ({'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 0}, True),
+    ({'ext': '.png'}, False),
+    ({'ext': '.jpeg', 'quality': 101}, False),
+    ({'ext': '.jpeg', 'quality': -1}, False),
+    ({'ext': '.jPg', 'quality': 50, 'progressive': 2}, False),
+    ({'ext': '.jPg', 'quality': 50, 'progressive': -1}, False),
+    ({'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 2}, False),
+    ({'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': -1}, False),
+]
+
+WEBP_FORMAT_CASES = [
+    ({'ext': '.webp'}, True),
+    ({'ext': '.webP', 'quality': 100}, True),
+    ({'ext': '.wEbP', 'quality': 50}, True),
+    ({'ext': '.Webp', 'quality': 0}, True),
+    ({'ext': '.png'}, False),
+    ({'ext': 'webp'}, False),
+    ({'ext': '.webp', 'quality': 101}, False),
+    ({'ext': '.webp', 'quality': -1}, False),
+]
+
+PNG_FORMAT_CASES = [
+    ({'ext': '.png'}, True),
+    ({'ext': '.pNg', 'compression': 0}, True),
+    ({'ext': '.png', 'compression': 5}, True),
+    ({'ext': '.png', 'compression': 9}, True),
+    ({'ext': '.webp'}, False),
+    ({'ext': 'png'}, False),
+    ({'ext': '.png', 'compression': 10}, False),
+    ({'ext': '.png', 'compression': -1}, False),
+]
+
+OUTPUT_FORMAT_CASES = [
+    *((data, True) for data in WRITE_FORMATS_VALID),
+    *((data, False) for data in WRITE_FORMATS_ERRORS),
+]
+
+
+def _case_id(value) -> str or None:
+    """Stable test id for a dict case, so a single case can be selected or re-run."""
+    if isinstance(value, dict):
+        return ','.join(
+            '%s=%s' % (key, _case_id(item) or item)
+            for key, item in sorted(value.items())
+        ) or 'empty'
+    if isinstance(value, list):
+        return '[%s]' % '|'.join(_case_id(item) or str(item) for item in value)
+    return None
+
+
+def _get_default_conf() -> dict:
+    """Get the ProcessConf configuration each test starts from."""
+    return {
+        'source_path': HelperTest.get_source_path(),
+        'output_path': HelperTest.get_output_path(),
+        'output_formats': [
             {
                 'fixed_width': 260,
                 'fixed_height': 200,
@@ -35,351 +177,289 @@ class TestModelConf:
                 ]
             }
         ]
-        self.obj = ProcessConf(
-            source_path=HelperTest.get_source_path(),
-            output_path=HelperTest.get_output_path(),
-            output_formats=output_formats
-        )
+    }
+
 
-    def test_is_ready(self):
+@pytest.fixture
+def conf() -> ProcessConf:
+    """New ProcessConf for the tests that change it, the static tests need no setup."""
+    return ProcessConf(**_get_default_conf())
+
+
+class TestProcessConf:
+
+    @staticmethod
+    def test_is_ready(conf):
         """Test is_ready method"""
-        assert self.obj.is_ready() is True
+        assert conf.is_ready() is True
 
-    def test_set_source_path(self):
+    @staticmethod
+    def test_pickle(conf):
+        """Test ProcessConf pickling"""
+        assert not hasattr(conf, '__dict__')
+        loaded = pickle.loads(pickle.dumps(conf))
+        assert loaded.is_ready() is True
+        assert loaded.get_source_path() == conf.get_source_path()
+        assert loaded.get_output_formats() == conf.get_output_formats()
+
+    @staticmethod
+    def test_to_dict(conf):
+        """Test to_dict method"""
+        data = conf.to_dict()
+        assert data == {
+            'source_path': HelperTest.get_source_path(),
+            'output_formats': conf.get_output_formats(),
+            'output_path': HelperTest.get_output_path()
+        }
+        new_conf = ProcessConf(**data)
+        assert new_conf.is_ready() is True
+        assert new_conf.to_dict() == data
+
+    @staticmethod
+    def test_set_source_path(conf):
         """Test set_source_path method"""
-        self.obj.source_path = None
-        assert self.obj.has_source_path() is False
-        assert self.obj.set_source_path(
+        conf.source_path = None
+        assert conf.has_source_path() is False
+        assert conf.set_source_path(
+            HelperTest.get_source_path()
+        ) is True
+        assert conf.get_source_path() == HelperTest.get_source_path()
+        assert conf.has_source_path() is True
+        assert conf.set_source_path('/bad_path') is False
+        assert conf.has_source_path() is False
+        assert conf.is_ready() is False
+        assert conf.set_source_path(
             HelperTest.get_source_path()
         ) is True
-        assert self.obj.get_source_path() == HelperTest.get_source_path()
-        assert self.obj.has_source_path() is True
-        assert self.obj.set_source_path('/bad_path') is False
-        assert self.obj.has_source_path() is False
+        assert conf.is_ready() is True
+
+    @staticmethod
+    def test_get_path_kind():
+        """Test get_path_kind method"""
+        assert ProcessConf.get_path_kind(HelperTest.get_source_path()) == 'dir'
+        assert ProcessConf.get_path_kind(
+            HelperTest.get_source_file('mar.jpg')
+        ) == 'file'
+        assert ProcessConf.get_path_kind('/bad_path') is None
+        assert ProcessConf.get_path_kind('') is None
+        assert ProcessConf.get_path_kind(None) is None
 
-    def test_set_output_path(self):
+    @staticmethod
+    def test_set_output_path(conf):
         """Test set_output_path method"""
-        self.obj.output_path = None
-        assert self.obj.has_output_path() is False
-        assert self.obj.set_output_path(
+        conf.output_path = None
+        assert conf.has_output_path() is False
+        assert conf.set_output_path(
             HelperTest.get_output_path()
         ) is True
-        assert self.obj.get_output_path() == HelperTest.get_output_path()
-        assert self.obj.has_output_path() is True
-        assert self.obj.set_output_path('/bad_path') is False
-        assert self.obj.has_output_path() is False
+        assert conf.get_output_path() == HelperTest.get_output_path()
+        assert conf.has_output_path() is True
+        assert conf.set_output_path('/bad_path') is False
+        assert conf.has_output_path() is False
 
-    def test_set_output_formats(self):
+    @staticmethod
+    def test_set_output_formats(conf):
         """Test set_output_formats method"""
-        self.obj.output_formats = None
-        assert self.obj.has_output_formats() is False
-        assert self.obj.set_output_formats([
-            {
-                'formats': [
-                    {'ext': '.jpg', 'quality': 80, 'progressive': 1, 'optimize': 1}
-                ]
-            },
-            {
-                'fixed_width': 260,
-                'formats': [
-                    {'ext': '.webp', 'quality': 80}
-                ]
-            },
-            {
-                'fixed_height': 260,
-                'formats': [
-                    {'ext': '.png', 'compression': 0}
-                ]
-            },
-            {
-                'fixed_size': 260,
-                'formats': [
-                    {'ext': '.png', 'compression': 0}
-                ]
-            },
-            {
-                'fixed_scale': 6,
-                'formats': [
-                    {'ext': '.png', 'compression': 0}
-                ]
-            }
-        ]) is True
-        assert self.obj.has_output_formats() is True
-        with pytest.raises(SettingInvalidException):
-            self.obj.set_output_formats([])
-        assert self.obj.get_output_formats() is None
-        error_values = [
-            {'nop': '.webp'},
-            {'ext': 'png'},
-            {'ext': '.tar'},
-            {'ext': '.pdf'},
-            {'ext': '.png', 'compression': 10},
-            {'ext': '.webp', 'quality': 101},
-            {'ext': '.jpeg', 'quality': 101},
-        ]
-        with pytest.raises(SettingInvalidException):
-            self.obj.set_output_formats(error_values)
+        conf.output_formats = None
+        assert conf.has_output_formats() is False
+        assert conf.set_output_formats(OUTPUT_FORMATS_VALID) is True
+        assert conf.has_output_formats() is True
+        # fixed_size is expanded to fixed_width and fixed_height
+        assert conf.get_output_formats()[3] == {
+            'fixed_width': 260,
+            'fixed_height': 260,
+            'formats': [
+                {'ext': '.png', 'compression': 0}
+            ]
+        }
 
     @staticmethod
-    def test_is_fixed_width_or_height():
-        """Test is_fixed_width_or_height method"""
-        true_values = [
-            {
-                'fixed_width': 260,
-                'fixed_height': 200
-            },
-            {'fixed_height': 200},
-            {'fixed_width': 200}
-        ]
-        for data in true_values:
-            assert ProcessConf.is_fixed_width_or_height(data) is True
+    @pytest.mark.parametrize("output_format", OUTPUT_FORMATS_VALID, ids=_case_id)
+    def test_set_output_formats_valid(conf, output_format):
+        """Test set_output_formats method with each valid output format"""
+        assert conf.set_output_formats([output_format]) is True
+        assert conf.is_ready() is True
 
-        assert ProcessConf.is_fixed_width_or_height({}) is False
+    @staticmethod
+    @pytest.mark.parametrize("output_format, expected", list(zip(
+        OUTPUT_FORMATS_VALID,
+        [False, True, True, True, True]
+    )))
+    def test_may_need_upscale(conf, output_format, expected):
+        """Test may_need_upscale method"""
+        assert conf.set_output_formats([output_format]) is True
+        assert conf.may_need_upscale() is expected
 
-        error_values = [
-            {
-                'fixed_width': 0,
-                'fixed_height': 260
-            },
-            {
-                'fixed_width': 260,
-                'fixed_height': 0
-            },
-            {
-                'fixed_width': 260,
-                'fixed_size': 260
-            },
-            {
-                'fixed_width': 260,
-                'fixed_scale': 2
-            },
-            {
-                'fixed_height': 260,
-                'fixed_size': 260
-            },
-            {
-                'fixed_height': 260,
-                'fixed_scale': 2
-            },
-            {'fixed_width': -1},
-            {'fixed_height': -1}
-        ]
+    @staticmethod
+    def test_set_output_formats_empty(conf):
+        """Test set_output_formats method with no output format"""
+        with pytest.raises(SettingInvalidException):
+            conf.set_output_formats([])
+        assert conf.get_output_formats() is None
+        assert conf.is_ready() is False
 
-        for data in error_values:
-            with pytest.raises(SettingInvalidException):
-                ProcessConf.is_fixed_width_or_height(data)
+    @staticmethod
+    @pytest.mark.parametrize("write_format", WRITE_FORMATS_ERRORS, ids=_case_id)
+    def test_set_output_formats_errors(conf, write_format):
+        """Test set_output_formats method errors"""
+        with pytest.raises(SettingInvalidException):
+            conf.set_output_formats([write_format])
+        with pytest.raises(SettingInvalidException):
+            conf.set_output_formats([{'formats': [write_format]}])
 
     @staticmethod
-    def test_is_fixed_size():
-        """Test is_fixed_size method"""
-        true_values = [
-            {'fixed_size': 260},
-            {'fixed_size': 1}
-        ]
-        for data in true_values:
-            assert ProcessConf.is_fixed_size(data) is True
+    @pytest.mark.parametrize("data, expected", FIXED_WIDTH_OR_HEIGHT_CASES, ids=_case_id)
+    def test_is_fixed_width_or_height(data, expected):
+        """Test is_fixed_width_or_height method"""
+        assert ProcessConf.is_fixed_width_or_height(data) is expected
 
-        assert ProcessConf.is_fixed_size({}) is False
+    @staticmethod
+    @pytest.mark.parametrize("data", FIXED_WIDTH_OR_HEIGHT_ERRORS, ids=_case_id)
+    def test_is_fixed_width_or_height_errors(data):
+        """Test is_fixed_width_or_height method errors"""
+        with pytest.raises(SettingInvalidException):
+            ProcessConf.is_fixed_width_or_height(data)
 
-        error_values = [
-            {
-                'fixed_scale': 2,
-                'fixed_size': 260
-            },
-            {
-                'fixed_width': 260,
-                'fixed_size': 260
-            },
-            {
-                'fixed_height': 260,
-                'fixed_size': 260
-            },
-            {'fixed_size': 0},
-            {'fixed_size': -1}
-        ]
+    @staticmethod
+    @pytest.mark.parametrize("data, expected", FIXED_SIZE_CASES, ids=_case_id)
+    def test_is_fixed_size(data, expected):
+        """Test is_fixed_size method"""
+        assert ProcessConf.is_fixed_size(data) is expected
 
-        for data in error_values:
-            with pytest.raises(SettingInvalidException):
-                ProcessConf.is_fixed_size(data)
+    @staticmethod
+    @pytest.mark.parametrize("data", FIXED_SIZE_ERRORS, ids=_case_id)
+    def test_is_fixed_size_errors(data):
+        """Test is_fixed_size method errors"""
+        with pytest.raises(SettingInvalidException):
+            ProcessConf.is_fixed_size(data)
 
     @staticmethod
-    def test_is_fixed_scale():
+    @pytest.mark.parametrize("data, expected", FIXED_SCALE_CASES, ids=_case_id)
+    def test_is_fixed_scale(data, expected):
         """Test is_fixed_scale method"""
-        true_values = [
-            {'fixed_scale': 2},
-            {'fixed_scale': 10}
-        ]
-        for data in true_values:
-            assert ProcessConf.is_fixed_scale(data) is True
-
-        assert ProcessConf.is_fixed_scale({}) is False
-
-        error_values = [
-            {
-                'fixed_scale': 2,
-                'fixed_size': 260
-            },
-            {
-                'fixed_width': 260,
-                'fixed_scale': 260
-            },
-            {
-                'fixed_height': 260,
-                'fixed_scale': 260
-            },
-            {'fixed_scale': 0},
-            {'fixed_scale': -1}
-        ]
+        assert ProcessConf.is_fixed_scale(data) is expected
 
-        for data in error_values:
-            with pytest.raises(SettingInvalidException):
-                ProcessConf.is_fixed_scale(data)
+    @staticmethod
+    @pytest.mark.parametrize("data", FIXED_SCALE_ERRORS, ids=_case_id)
+    def test_is_fixed_scale_errors(data):
+        """Test is_fixed_scale method errors"""
+        with pytest.raises(SettingInvalidException):
+            ProcessConf.is_fixed_scale(data)
 
     @staticmethod
-    def test_set_output_size():
+    @pytest.mark.parametrize("data, expected", OUTPUT_SIZE_CASES, ids=_case_id)
+    def test_set_output_size(data, expected):
         """Test set_output_size method"""
-        true_values = [
-            {},
-            {
-                'fixed_height': 260,
-                'fixed_width': 10
-            },
-            {
-                'fixed_height': 260,
-                'fixed_width': None
-            },
-            {
-                'fixed_height': None,
-                'fixed_width': 10
-            },
-            {'fixed_scale': 2}
+        result = ProcessConf.set_output_size(data)
+        assert result == expected
+        # a new dict, the output format is left unchanged
+        assert result is not data
+        # resolved from cache
+        assert ProcessConf.set_output_size(data) == expected
 
-        ]
-        for data in true_values:
-            assert ProcessConf.set_output_size(data) == data
+    @staticmethod
+    @pytest.mark.parametrize("data", OUTPUT_SIZE_ERRORS, ids=_case_id)
+    def test_set_output_size_errors(data):
+        """Test set_output_size method errors"""
+        with pytest.raises(SettingInvalidException):
+            ProcessConf.set_output_size(data)
 
-        assert ProcessConf.set_output_size({'fixed_size': 260}) == {
-            'fixed_height': 260,
-            'fixed_width': 260
+    @staticmethod
+    def test_get_output_size_by_key():
+        """Test get_output_size_by_key method"""
+        key = frozenset({('fixed_width', int, 200), ('fixed_height', int, 100)})
+        result = ProcessConf.get_output_size_by_key(key)
+        assert result == {'fixed_width': 200, 'fixed_height': 100}
+        # cached result
+        assert ProcessConf.get_output_size_by_key(key) is result
+        with pytest.raises(SettingInvalidException):
+            ProcessConf.get_output_size_by_key(frozenset({('fixed_scale', int, 1)}))
+
+    @staticmethod
+    def test_get_output_size():
+        """Test get_output_size method"""
+        assert ProcessConf.get_output_size({}) == {}
+        assert ProcessConf.get_output_size({'fixed_size': 260}) == {
+            'fixed_width': 260,
+            'fixed_height': 260
         }
+        with pytest.raises(SettingInvalidException):
+            ProcessConf.get_output_size({'fixed_size': 260, 'fixed_scale': 2})
+
+    @staticmethod
+    def test_is_write_options():
+        """Test is_write_options method"""
+        options = {'quality': (0, 100), 'progressive': (0, 1)}
+        assert ProcessConf.is_write_options({'ext': '.jpg'}, options) is True
+        assert ProcessConf.is_write_options({'quality': 0, 'progressive': 1}, options) is True
+        assert ProcessConf.is_write_options({'quality': 101}, options) is False
+        assert ProcessConf.is_write_options({'progressive': -1}, options) is False
+        assert ProcessConf.is_write_options({'quality': '80'}, options) is False
 
     @staticmethod
-    def test_is_output_write_jpg_format():
+    @pytest.mark.parametrize("data, expected", JPG_FORMAT_CASES, ids=_case_id)
+    def test_is_output_write_jpg_format(data, expected):
         """Test is_output_write_jpg_format method"""
-        true_values = [
-            {'ext': '.jpg'},
-            {'ext': '.jpeg', 'quality': 100},
-            {'ext': '.jPg', 'quality': 50, 'progressive': 0},
-            {'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 1},
-            {'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 0}
-        ]
-        for data in true_values:
-            assert ProcessConf.is_output_write_jpg_format(data) is True
-
-        false_values = [
-            {'ext': '.png'},
-            {'ext': '.jpeg', 'quality': 101},
-            {'ext': '.jpeg', 'quality': -1},
-            {'ext': '.jPg', 'quality': 50, 'progressive': 2},
-            {'ext': '.jPg', 'quality': 50, 'progressive': -1},
-            {'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 2},
-            {'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': -1}
-        ]
-        for data in false_values:
-            assert ProcessConf.is_output_write_jpg_format(data) is False
+        assert ProcessConf.is_output_write_jpg_format(data) is expected
 
     @staticmethod
-    def test_is_output_write_webp_format():
+    @pytest.mark.parametrize("data, expected", WEBP_FORMAT_CASES, ids=_case_id)
+    def test_is_output_write_webp_format(data, expected):
         """Test is_output_write_webp_format method"""
-        true_values = [
-            {'ext': '.webp'},
-            {'ext': '.webP', 'quality': 100},
-            {'ext': '.wEbP', 'quality': 50},
-            {'ext': '.Webp', 'quality': 0}
-        ]
-        for data in true_values:
-            assert ProcessConf.is_output_write_webp_format(data) is True
-
-        false_values = [
-            {'ext': '.png'},
-            {'ext': 'webp'},
-            {'ext': '.webp', 'quality': 101},
-            {'ext': '.webp', 'quality': -1}
-        ]
-        for data in false_values:
-            assert ProcessConf.is_output_write_webp_format(data) is False
+        assert ProcessConf.is_output_write_webp_format(data) is expected
 
     @staticmethod
-    def test_is_output_write_png_format():
+    @pytest.mark.parametrize("data, expected", PNG_FORMAT_CASES, ids=_case_id)
+    def test_is_output_write_png_format(data, expected):
         """Test is_output_write_png_format method"""
-        true_values = [
-            {'ext': '.png'},
-            {'ext': '.pNg', 'compression': 0},
-            {'ext': '.png', 'compression': 5},
-            {'ext': '.png', 'compression': 9}
-        ]
-        for data in true_values:
-            assert ProcessConf.is_output_write_png_format(data) is True
-
-        false_values = [
-            {'ext': '.webp'},
-            {'ext': 'png'},
-            {'ext': '.png', 'compression': 10},
-            {'ext': '.png', 'compression': -1}
-        ]
-        for data in false_values:
-            assert ProcessConf.is_output_write_png_format(data) is False
+        assert ProcessConf.is_output_write_png_format(data) is expected
 
     @staticmethod
-    def test_is_output_write_formats():
+    @pytest.mark.parametrize("data, expected", OUTPUT_FORMAT_CASES, ids=_case_id)
+    def test_is_output_write_formats(data, expected):
         """Test is_valid_output_format method"""
-        true_values = [
-            {'ext': '.png'},
-            {'ext': '.pNg', 'compression': 0},
-            {'ext': '.wEbP'},
-            {'ext': '.wEbP', 'quality': 50},
-            {'ext': '.jPeg'},
-            {'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 1},
-        ]
-        for data in true_values:
-            assert ProcessConf.is_valid_output_format(data) is True
-
-        false_values = [
-            {'nop': '.webp'},
-            {'ext': 'png'},
-            {'ext': '.tar'},
-            {'ext': '.pdf'},
-            {'ext': '.png', 'compression': 10},
-            {'ext': '.webp', 'quality': 101},
-            {'ext': '.jpeg', 'quality': 101},
-        ]
-        for data in false_values:
-            assert ProcessConf.is_valid_output_format(data) is False
+        assert ProcessConf.is_valid_output_format(data) is expected
+
+    @staticmethod
+    def test_get_write_formats_key():
+        """Test get_write_formats_key method"""
+        key = ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 6}])
+        assert key == ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 6}])
+        assert key != ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 6.0}])
+        assert ProcessConf.get_write_formats_key([{'ext': ['.png']}]) is None
+        assert ProcessConf.get_write_formats_key(['.png']) is None
+
+    @staticmethod
+    def test_is_valid_write_formats_key():
+        """Test is_valid_write_formats_key method"""
+        key = ProcessConf.get_write_formats_key([{'ext': '.png', 'compression': 6}, {'ext': '.JPG'}])
+        assert ProcessConf.is_valid_write_formats_key(key) is True
+        assert ProcessConf.is_valid_write_formats_key(
+            ProcessConf.get_write_formats_key([{'ext': '.png'}, {'ext': '.png', 'compression': 6.0}])
+        ) is False
+        assert ProcessConf.is_valid_write_formats_key(
+            ProcessConf.get_write_formats_key([{'ext': '.pb'}])
+        ) is False
 
     @staticmethod
     def test_set_write_format():
         """Test set_output_format method"""
-        true_values = [
-            {'ext': '.png'},
-            {'ext': '.pNg', 'compression': 0},
-            {'ext': '.wEbP'},
-            {'ext': '.wEbP', 'quality': 50},
-            {'ext': '.jPeg'},
-            {'ext': '.jPeg', 'quality': 50, 'progressive': 1, 'optimize': 1},
-        ]
-        assert ProcessConf.set_output_format(true_values) == {'formats': true_values}
+        formats = copy.deepcopy(WRITE_FORMATS_VALID)
+        expected = {
+            'formats': [
+                dict(write_format, ext=write_format['ext'].lower())
+                for write_format in WRITE_FORMATS_VALID
+            ]
+        }
+        assert ProcessConf.set_output_format(WRITE_FORMATS_VALID) == expected
+        # already validated
+        assert ProcessConf.set_output_format(WRITE_FORMATS_VALID) == expected
+        # extensions are normalized in copies, the write formats given are unchanged
+        assert WRITE_FORMATS_VALID == formats
+        with pytest.raises(SettingInvalidException):
+            ProcessConf.set_output_format([{'ext': '.png', 'compression': 0.0}])
 
         assert ProcessConf.set_output_format([]) is None
 
-        error_values = [
-            {'nop': '.webp'},
-            {'ext': 'png'},
-            {'ext': '.tar'},
-            {'ext': '.pdf'},
-            {'ext': '.png', 'compression': 10},
-            {'ext': '.webp', 'quality': 101},
-            {'ext': '.jpeg', 'quality': 101},
-        ]
-
         with pytest.raises(SettingInvalidException):
-            ProcessConf.set_output_format(error_values)
+            ProcessConf.set_output_format(WRITE_FORMATS_ERRORS)
@@ -0,0 +1,86 @@
+"""
+Worker functions unittest class.
+
+Use pytest package.
+"""
+import pytest
+from .helper import HelperTest
+from imgtools_m8 import worker
+
+__author__ = "Eli Serra"
+__copyright__ = "Copyright 2020, Eli Serra"
+__deprecated__ = False
+__license__ = "Apache Software License"
+__status__ = "Production"
+__version__ = "1.0.0"
+
+
+class TestWorker:
+
+    @pytest.fixture(autouse=True)
+    def setup_worker(self, tmp_path):
+        """
+        Setup any state tied to the execution of the given function.
+
+        Invoked for every test function in the module,
+        images are written in a temporary output directory.
+        """
+        worker.init_worker({
+            'source_path': HelperTest.get_source_path(),
+            'output_path': str(tmp_path),
+            'output_formats': [
+                {
+                    'fixed_width': 35,
+                    'fixed_height': 22,
+                    'formats': [
+                        {'ext': '.jpg', 'quality': 80}
+                    ]
+                }
+            ],
+            'model_conf': None
+        })
+
+    @staticmethod
+    def test_init_worker():
+        """Test init_worker function"""
+        assert worker._TOOLS.is_ready() is True
+        # loaded once at startup, output sizes may need an upscale
+        assert worker._TOOLS.has_expander_model() is True
+
+    @staticmethod
+    def test_init_worker_convert_only(tmp_path):
+        """Test init_worker function doesn't load the model if no output format sets a size"""
+        worker.init_worker({
+            'source_path': HelperTest.get_source_path(),
+            'output_path': str(tmp_path),
+            'output_formats': [
+                {
+                    'formats': [
+                        {'ext': '.webp', 'quality': 80}
+                    ]
+                }
+            ],
+            'model_conf': None
+        })
+        assert worker._TOOLS.is_ready() is True
+        assert worker._TOOLS.has_expander_model() is False
+
+    @staticmethod
+    def test_run_one():
+        """Test run_one function"""
+        assert worker.run_one(
+            HelperTest.get_source_file('mar.jpg'),
+            'mar.jpg'
+        ) is True
+        assert worker.run_one(
+            HelperTest.get_source_file('bad_image.jpg'),
+            'bad_image.jpg'
+        ) is False
+
+    @staticmethod
+    def test_run_batch():
+        """Test run_batch function"""
+        good = (HelperTest.get_source_file('mar.jpg'), 'mar.jpg')
+        bad = (HelperTest.get_source_file('bad_image.jpg'), 'bad_image.jpg')
+        assert worker.run_batch((good,)) is True
+        assert worker.run_batch((bad, good)) is False